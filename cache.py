@@ -0,0 +1,291 @@
+##############################################################
+###                                                        ###
+###             CYCLICA ALPHAFOLD 2 CHALLENGE              ###
+###                                                        ###
+##############################################################
+
+# cache.py keeps finished feature matrices on disk so training and scoring
+# runs do not re-parse and re-featurize a CSV that has not changed.
+#
+# Each cached input gets a directory of .npy files, named after the content
+# hash of the CSV and FEATURE_VERSION. Editing the CSV or bumping the feature
+# version changes the name, so stale entries are simply never looked up again.
+# Arrays are opened memory-mapped, so a warm start only touches the pages the
+# caller actually reads.
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from collections import namedtuple
+from contextlib import contextmanager
+
+import numpy as np
+
+from featurizer import (FEATURE_VERSION, LABEL_COLUMN, build_label, build_parameters,
+                        feature_names)
+from loader import ProteinIndex, load_residues, sort_by_entry
+from parallel import build_parameters_parallel
+
+CACHE_DIR = '.feature_cache'
+
+
+class Features(namedtuple('Features', ['parameters', 'label', 'ids', 'rows', 'index',
+                                       'positions', 'digests'])):
+    """Cached features of one CSV.
+
+    Rows are stored in (entry, entry_index) order, so `index` (a
+    ProteinIndex) can hand out each protein as a contiguous slice. `ids` are
+    the CSV row ids, `rows` the CSV line positions and `positions` the
+    entry_index values of the stored rows. `digests` holds one content hash
+    per protein (see entry_digests()).
+    """
+
+    __slots__ = ()
+
+    def in_file_order(self, values):
+        """Put per-row `values` back in the order of the CSV."""
+        out = np.empty_like(values)
+        out[self.rows] = values
+        return out
+
+
+def file_digest(path, cache_dir=CACHE_DIR):
+    """Return the sha256 of `path`, remembered by (size, mtime) between runs."""
+    stat = os.stat(path)
+    stamp = [stat.st_size, stat.st_mtime_ns]
+    key = os.path.abspath(path)
+
+    memo_path = os.path.join(cache_dir, 'digests.json')
+    try:
+        with open(memo_path) as memo_file:
+            memo = json.load(memo_file)
+    except (OSError, ValueError):
+        memo = {}
+
+    if key in memo and memo[key][:2] == stamp:
+        return memo[key][2]
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for block in iter(lambda: source.read(1 << 20), b''):
+            digest.update(block)
+    digest = digest.hexdigest()
+
+    memo[key] = stamp + [digest]
+    os.makedirs(cache_dir, exist_ok=True)
+    _write_atomic(memo_path, lambda out: json.dump(memo, out))
+    return digest
+
+
+def cache_path(path, cache_dir=CACHE_DIR, stages=()):
+    """Directory the features for `path` are (or would be) cached in."""
+    name = os.path.basename(path).split('.')[0]
+    digest = file_digest(path, cache_dir)[:16]
+    directory = '{}-{}-v{}'.format(name, digest, FEATURE_VERSION)
+    return os.path.join(cache_dir, directory + _stages_suffix(stages))
+
+
+def _stages_suffix(stages):
+    # Matrices built with extra feature stages get their own entry.
+    if not stages:
+        return ''
+    columns = ','.join(feature_names(stages=stages)).encode()
+    return '-' + hashlib.sha256(columns).hexdigest()[:8]
+
+
+@contextmanager
+def staging_directory(directory, replace=False):
+    """Yield a scratch directory that is renamed to `directory` on success.
+
+    With `replace`, an existing `directory` is swapped out and deleted.
+    """
+    parent = os.path.dirname(directory) or '.'
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=parent, prefix='.staging-')
+    try:
+        yield staging
+        if replace and os.path.isdir(directory):
+            retired = staging + '-retired'
+            os.rename(directory, retired)
+            os.rename(staging, directory)
+            shutil.rmtree(retired, ignore_errors=True)
+        else:
+            os.replace(staging, directory)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+
+def save_arrays(directory, **arrays):
+    """Write each array to <directory>/<name>.npy, all or nothing."""
+    with staging_directory(directory) as staging:
+        for name, array in arrays.items():
+            np.save(os.path.join(staging, name + '.npy'), array)
+
+
+def load_arrays(directory, mmap_mode='r'):
+    """Open every .npy file in `directory`, memory-mapped by default."""
+    return {name[:-len('.npy')]: np.load(os.path.join(directory, name), mmap_mode=mmap_mode)
+            for name in os.listdir(directory) if name.endswith('.npy')}
+
+
+def load_features(path, labeled=None, cache_dir=CACHE_DIR, stages=(), processes=None):
+    """Return the Features of an AF2 residue CSV.
+
+    The first call featurizes the CSV and stores the result under
+    `cache_dir`; later calls with the same file contents and FEATURE_VERSION
+    memory-map the stored arrays instead. `label` is None for unlabeled input.
+    With `processes` > 1 the featurization is sharded across that many
+    worker processes (see parallel.py).
+    """
+    directory = cache_path(path, cache_dir, stages)
+
+    if not os.path.isdir(directory):
+        data, index, rows = sort_by_entry(load_residues(path, stages=stages))
+        arrays = _layout_arrays(data, index, rows)
+        try:
+            with staging_directory(directory) as staging:
+                parameters = os.path.join(staging, 'parameters.npy')
+                if processes and processes > 1:
+                    build_parameters_parallel(data, parameters, stages=stages, processes=processes)
+                else:
+                    np.save(parameters, build_parameters(data, stages=stages))
+                for name, array in arrays.items():
+                    np.save(os.path.join(staging, name + '.npy'), array)
+        except OSError:
+            # Another run finished caching the same input first.
+            if not os.path.isdir(directory):
+                raise
+
+    return _features(load_arrays(directory), path, labeled)
+
+
+def _features(arrays, path, labeled):
+    label = arrays.get('label')
+    if labeled and label is None:
+        raise ValueError('{} has no y_Ligand column'.format(path))
+
+    return Features(arrays['parameters'], label, arrays['ids'], arrays['rows'],
+                    ProteinIndex(arrays['entries'], arrays['offsets']), arrays['positions'],
+                    arrays['digests'])
+
+
+def _layout_arrays(data, index, rows, digests=None):
+    arrays = {'ids': data.index.to_numpy(),
+              'rows': rows,
+              'positions': data['entry_index'].to_numpy(),
+              'entries': index.entries,
+              'offsets': index.offsets,
+              'digests': entry_digests(data, index) if digests is None else digests}
+    if LABEL_COLUMN in data:
+        arrays['label'] = build_label(data)
+    return arrays
+
+
+# Incremental feature store.
+#
+# The cache above is all or nothing: any edit to the CSV means featurizing it
+# again from scratch. A feature store is instead kept per input name and
+# updated in place. Every protein's rows are hashed, and on the next run only
+# proteins whose hash is new or different are featurized; the rows of every
+# other protein are copied over from the previous store. The CSV still has to
+# be parsed to find the changes, but featurization (by far the larger cost
+# once spatial stages are on) scales with the delta. An unchanged CSV is
+# recognised by its content digest and not parsed at all.
+
+StoreUpdate = namedtuple('StoreUpdate', ['added', 'changed', 'removed'])
+
+
+def store_path(path, cache_dir=CACHE_DIR, stages=()):
+    """Directory of the incremental feature store for `path`."""
+    name = os.path.basename(path).split('.')[0]
+    directory = '{}-store-v{}'.format(name, FEATURE_VERSION)
+    return os.path.join(cache_dir, directory + _stages_suffix(stages))
+
+
+def entry_digests(data, index):
+    """One 64-bit content hash per protein of entry-sorted `data`."""
+    import pandas as pd
+    row_hashes = pd.util.hash_pandas_object(data, index=False).to_numpy()
+    if not len(row_hashes):
+        return row_hashes
+    return np.add.reduceat(row_hashes, index.offsets[:-1])
+
+
+def update_features(path, labeled=None, cache_dir=CACHE_DIR, stages=(), processes=None):
+    """Bring the feature store for `path` up to date and return its Features.
+
+    Only proteins (entries) that are new or whose rows changed since the last
+    update are featurized. Returns (features, StoreUpdate) where the update
+    lists the added, changed and removed entry ids.
+    """
+    directory = store_path(path, cache_dir, stages)
+    source = file_digest(path, cache_dir)
+
+    old = load_arrays(directory) if os.path.isdir(directory) else None
+    if old is not None and str(old['source']) == source:
+        return _features(old, path, labeled), StoreUpdate([], [], [])
+
+    data, index, rows = sort_by_entry(load_residues(path, stages=stages))
+    digests = entry_digests(data, index)
+
+    if old is None:
+        old = {'entries': np.array([], dtype=str), 'offsets': np.zeros(1, dtype=np.int64),
+               'digests': np.array([], dtype=np.uint64)}
+
+    # Match proteins to the previous store by entry id (both lists are sorted).
+    match = np.searchsorted(old['entries'], index.entries)
+    found = match < len(old['entries'])
+    found[found] = old['entries'][match[found]] == index.entries[found]
+    same = found.copy()
+    same[found] = old['digests'][match[found]] == digests[found]
+
+    update = StoreUpdate(added=index.entries[~found].tolist(),
+                         changed=index.entries[found & ~same].tolist(),
+                         removed=np.setdiff1d(old['entries'], index.entries).tolist())
+
+    n_features = len(feature_names(stages=stages))
+
+    with staging_directory(directory, replace=True) as staging:
+        parameters = np.lib.format.open_memmap(os.path.join(staging, 'parameters.npy'), mode='w+',
+                                               dtype=np.float32, shape=(len(data), n_features))
+
+        # Unchanged proteins: copy their rows across from the previous store.
+        if same.any():
+            previous = ProteinIndex(old['entries'], old['offsets'])
+            kept = index.protein_rows(np.flatnonzero(same))
+            parameters[kept] = old['parameters'][previous.protein_rows(match[same])]
+
+        # New and changed proteins: featurize just their rows.
+        redo = index.protein_rows(np.flatnonzero(~same))
+        if len(redo):
+            delta = data.iloc[redo]
+            if processes and processes > 1:
+                scratch = os.path.join(staging, 'delta.npy')
+                parameters[redo] = build_parameters_parallel(delta, scratch, stages=stages,
+                                                             processes=processes)
+                os.unlink(scratch)
+            else:
+                parameters[redo] = build_parameters(delta, stages=stages)
+        parameters.flush()
+        del parameters
+
+        arrays = _layout_arrays(data, index, rows, digests)
+        arrays.update(source=np.array(source))
+        for name, array in arrays.items():
+            np.save(os.path.join(staging, name + '.npy'), array)
+
+    return _features(load_arrays(directory), path, labeled), update
+
+
+def _write_atomic(path, write):
+    fd, staging = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix='.staging-')
+    try:
+        with os.fdopen(fd, 'w') as out:
+            write(out)
+        os.replace(staging, path)
+    except BaseException:
+        os.unlink(staging)
+        raise
@@ -0,0 +1,224 @@
+##############################################################
+###                                                        ###
+###             CYCLICA ALPHAFOLD 2 CHALLENGE              ###
+###                                                        ###
+##############################################################
+
+# cli.py is one entry point for the whole pipeline:
+#
+#   python cli.py featurize af2_dataset_training_labeled.csv
+#   python cli.py train --model mlp af2_dataset_training_labeled.csv
+#   python cli.py score --model model.npz af2_dataset_testset_unlabeled.csv
+#   python cli.py evaluate --model model.npz af2_dataset_training_labeled.csv
+#
+# Only the standard library is imported up front. Each subcommand imports
+# what it uses when it runs, so featurizing a cached file never loads
+# TensorFlow, scoring with an exported .npz model never loads TensorFlow or
+# sklearn, and so on. Add --startup-profile (before the subcommand) to print
+# how long each module took to import.
+
+import argparse
+import builtins
+import sys
+import time
+
+DEFAULT_TRAINING = "af2_dataset_training_labeled.csv"
+
+
+class ImportProfile:
+    """Times every module imported while installed, per top-level package.
+
+    A module's time is its own: imports it triggers are counted separately.
+    """
+
+    def __init__(self):
+        self.times = {}
+        self._children = []
+        self._import = builtins.__import__
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level:
+            # Relative import: resolve against the importing package.
+            package = (globals or {}).get('__package__') or ''
+            module = package + ('.' + name if name else '')
+        else:
+            module = name
+        if module in sys.modules:
+            return self._import(name, globals, locals, fromlist, level)
+
+        self._children.append(0.0)
+        start = time.perf_counter()
+        try:
+            return self._import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = self._children.pop()
+            top = module.split('.')[0]
+            self.times[top] = self.times.get(top, 0.0) + elapsed - children
+            if self._children:
+                self._children[-1] += elapsed
+
+    def install(self):
+        builtins.__import__ = self._timed_import
+        return self
+
+    def report(self, out=sys.stderr, top=20):
+        builtins.__import__ = self._import
+        ranked = sorted(self.times.items(), key=lambda item: -item[1])
+        print('Import time: {:.3f}s over {} packages'.format(sum(self.times.values()), len(ranked)),
+              file=out)
+        for name, seconds in ranked[:top]:
+            print('  {:8.3f}s  {}'.format(seconds, name), file=out)
+
+
+def _stages(names):
+    stages = []
+    for name in names:
+        if name == 'neighborhood':
+            from neighborhood import neighborhood_stage
+            stages.append(neighborhood_stage())
+        elif name == 'window':
+            from window import window_stage
+            stages.append(window_stage())
+    return tuple(stages)
+
+
+def _load_model(path):
+    # Exported .npz weights run in NumPy; anything else is a Keras model.
+    if path.endswith('.npz'):
+        from numpy_mlp import NumpyMLP
+        return NumpyMLP.load(path)
+    from tensorflow.keras.models import load_model
+    return load_model(path)
+
+
+def featurize(args):
+    if args.incremental:
+        from cache import update_features
+        features, update = update_features(args.path, stages=_stages(args.stages),
+                                           processes=args.processes)
+        print('Featurized {} new and {} changed entries, dropped {}'.format(
+            len(update.added), len(update.changed), len(update.removed)))
+    else:
+        from cache import load_features
+        features = load_features(args.path, stages=_stages(args.stages), processes=args.processes)
+    print('{} residues x {} features in {} proteins'.format(
+        features.parameters.shape[0], features.parameters.shape[1], features.index.n_proteins))
+
+
+def train(args):
+    import numpy as np
+
+    if args.model == 'xgboost':
+        from binning import load_bins
+        from cache import load_features
+        from models import train_xgboost
+        from warmstart import model_directory, save_model_version, seen_proteins
+
+        features = load_features(args.path, labeled=True)
+        codes, cuts = load_bins(args.path)
+        xgb = train_xgboost(codes, features.label, np.arange(len(features.label)),
+                            threads=args.threads)
+        version = save_model_version(xgb, model_directory('xgboost'), cuts=cuts,
+                                     seen=seen_proteins(features), source=args.path)
+        print('Saved XGBoost model version {}'.format(version))
+    else:
+        from cache import load_features
+        from models import train_mlp
+        from warmstart import model_directory, save_model_version, seen_proteins
+
+        features = load_features(args.path, labeled=True)
+        ann = train_mlp(features.parameters, features.label, np.arange(len(features.label)),
+                        threads=args.threads, epochs=args.epochs, verbose=1)
+        ann.save(args.output)
+        version = save_model_version(ann, model_directory('mlp'), seen=seen_proteins(features),
+                                     source=args.path)
+        print('Saved {} and model version {}'.format(args.output, version))
+
+
+def score(args):
+    if args.store:
+        from predcache import model_version
+        from predstore import PredictionStore, score_proteins
+        from submission import write_features_submission
+
+        # Only proteins the store has not seen under this model reach it.
+        store = PredictionStore(model_version(args.model), args.store)
+        features, probabilities, reused, scored = score_proteins(_load_model(args.model),
+                                                                 args.path, store)
+        write_features_submission(args.output, features, probabilities, args.threshold,
+                                  args.probabilities, args.residues)
+        print('Scored {} proteins, reused {} from {}'.format(scored, reused, args.store))
+        return
+
+    from scoring import score_csv
+
+    scored = score_csv(_load_model(args.model), args.path, args.output,
+                       chunksize=args.chunksize, threshold=args.threshold,
+                       probabilities=args.probabilities, residues=args.residues)
+    print('Scored {} residues into {}'.format(scored, args.output))
+
+
+def evaluate(args):
+    from cache import load_features
+    from crossval import fold_scores
+    from models import predict_probabilities
+
+    features = load_features(args.path, labeled=True)
+    scores = fold_scores(features.label, predict_probabilities(_load_model(args.model),
+                                                                features.parameters))
+    print('ROC-AUC {roc_auc:.4f}  PR-AUC {pr_auc:.4f}'.format(**scores))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Drug binding residue pipeline.")
+    parser.add_argument("--startup-profile", action="store_true",
+                        help="report the import time of each module on stderr")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("featurize", help="build (or refresh) the cached feature matrix")
+    command.add_argument("path")
+    command.add_argument("--incremental", action="store_true",
+                         help="update the incremental feature store instead of the cache")
+    command.add_argument("--processes", type=int)
+    command.add_argument("--stage", dest="stages", action="append", default=[],
+                         choices=["neighborhood", "window"], help="extra feature stage (repeatable)")
+    command.set_defaults(run=featurize)
+
+    command = commands.add_parser("train", help="train a model on a labeled CSV")
+    command.add_argument("path", nargs="?", default=DEFAULT_TRAINING)
+    command.add_argument("--model", choices=["mlp", "xgboost"], default="mlp")
+    command.add_argument("--output", default="model.h5", help="where the Keras model is saved")
+    command.add_argument("--epochs", type=int, default=8)
+    command.add_argument("--threads", type=int)
+    command.set_defaults(run=train)
+
+    command = commands.add_parser("score", help="write an id,Predicted submission for a CSV, chunk by chunk")
+    command.add_argument("path")
+    command.add_argument("--model", default="model.h5", help="model.h5, or an .npz from numpy_mlp.py")
+    command.add_argument("--output", default="output.csv",
+                         help="submission file: .csv, .csv.gz, .parquet or .npz")
+    command.add_argument("--probabilities", action="store_true", help="add a Probability column")
+    command.add_argument("--residues", action="store_true", help="add entry and entry_index columns")
+    command.add_argument("--chunksize", type=int, default=200000)
+    command.add_argument("--threshold", type=float, default=0.5)
+    command.add_argument("--store", metavar="DIR", nargs="?", const=".prediction_store",
+                         help="reuse and keep per-protein predictions in DIR (default: %(const)s)")
+    command.set_defaults(run=score)
+
+    command = commands.add_parser("evaluate", help="ROC-AUC and PR-AUC on a labeled CSV")
+    command.add_argument("path", nargs="?", default=DEFAULT_TRAINING)
+    command.add_argument("--model", default="model.h5", help="model.h5, or an .npz from numpy_mlp.py")
+    command.set_defaults(run=evaluate)
+
+    args = parser.parse_args(argv)
+    profile = ImportProfile().install() if args.startup_profile else None
+    try:
+        args.run(args)
+    finally:
+        if profile:
+            profile.report()
+
+
+if __name__ == '__main__':
+    main()
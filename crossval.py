@@ -0,0 +1,165 @@
+##############################################################
+###                                                        ###
+###             CYCLICA ALPHAFOLD 2 CHALLENGE              ###
+###                                                        ###
+##############################################################
+
+# crossval.py scores a model with k-fold cross validation grouped by protein.
+#
+# A random residue-level split puts residues of the same protein on both
+# sides, so the test score rewards memorising proteins. Here every `entry`
+# falls in exactly one fold, and folds are cut to hold similar residue counts.
+#
+# Folds train at the same time in separate worker processes. Each worker
+# memory-maps the cached feature matrix (featurized once, up front) and is
+# limited to `threads` math threads, so k folds share the machine instead of
+# each trying to use all of it. XGBoost folds share one binned matrix too.
+#
+#   python crossval.py --folds 5 --model xgboost af2_dataset_training_labeled.csv
+
+import argparse
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+
+from binning import load_bins
+from cache import CACHE_DIR, load_features
+from models import TRAINERS, predict_probabilities
+
+FOLDS = 5
+
+# Thread pools sized from these when TensorFlow, XGBoost or BLAS start up.
+
+THREAD_VARIABLES = ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS',
+                    'TF_NUM_INTRAOP_THREADS', 'TF_NUM_INTEROP_THREADS')
+
+
+def protein_folds(index, k=FOLDS, seed=42):
+    """Deal the proteins of `index` into `k` folds of about equal residue count.
+
+    Proteins go largest first to the fold with the fewest residues so far
+    (ties between equal sizes broken by `seed`), so no fold is left empty.
+    Returns one sorted array of protein numbers per fold.
+    """
+    if k < 2 or k > index.n_proteins:
+        raise ValueError('cannot make {} folds from {} proteins'.format(k, index.n_proteins))
+
+    shuffled = np.random.default_rng(seed).permutation(index.n_proteins)
+    order = shuffled[np.argsort(-index.sizes()[shuffled], kind='stable')]
+
+    residues = np.zeros(k, dtype=np.int64)
+    counts = np.zeros(k, dtype=np.int64)
+    fold = np.empty(index.n_proteins, dtype=np.int64)
+    for protein, size in zip(order.tolist(), index.sizes()[order].tolist()):
+        # Fewest residues, then fewest proteins, so empty proteins spread too.
+        fold[protein] = smallest = int(np.lexsort((counts, residues))[0])
+        residues[smallest] += size
+        counts[smallest] += 1
+    if not counts.all():
+        raise ValueError('fold {} came out empty'.format(int(np.argmin(counts))))
+    return [np.flatnonzero(fold == number) for number in range(k)]
+
+
+def fold_scores(label, probabilities):
+    """ROC-AUC and PR-AUC of `probabilities` against `label`."""
+    from sklearn import metrics
+    label = np.asarray(label).reshape(-1)
+    fpr, tpr, _ = metrics.roc_curve(label, probabilities, pos_label=1)
+    precision, recall, _ = metrics.precision_recall_curve(label, probabilities)
+    return {'roc_auc': metrics.auc(fpr, tpr), 'pr_auc': metrics.auc(recall, precision)}
+
+
+def model_inputs(path, model, cache_dir=CACHE_DIR, stages=()):
+    """Features of `path` and the matrix `model` trains on.
+
+    XGBoost trains on the cached bin codes (binning.py), the network on the
+    float features.
+    """
+    features = load_features(path, labeled=True, cache_dir=cache_dir, stages=stages)
+    if model == 'xgboost':
+        return features, load_bins(path, cache_dir, stages)[0]
+    return features, features.parameters
+
+
+@contextmanager
+def limited_threads(threads):
+    """Cap the math threads of worker processes started inside the block.
+
+    The caps go into os.environ, which spawned workers inherit before they
+    import anything; this process's environment is restored afterwards.
+    """
+    saved = {variable: os.environ.get(variable) for variable in THREAD_VARIABLES}
+    for variable in THREAD_VARIABLES:
+        os.environ[variable] = str(1 if variable == 'TF_NUM_INTEROP_THREADS' else threads)
+    try:
+        yield
+    finally:
+        for variable, value in saved.items():
+            if value is None:
+                os.environ.pop(variable, None)
+            else:
+                os.environ[variable] = value
+
+
+def _run_fold(path, test_proteins, model, cache_dir, stages, seed, threads):
+    # The cache is warm by now, so this only memory-maps the arrays.
+    features, matrix = model_inputs(path, model, cache_dir, stages)
+    test = features.index.protein_rows(test_proteins)
+    train = np.setdiff1d(np.arange(len(features.label)), test, assume_unique=True)
+
+    fitted = TRAINERS[model](matrix, features.label, train, seed=seed, threads=threads)
+    scores = fold_scores(features.label[test], predict_probabilities(fitted, matrix[test]))
+    scores.update(proteins=len(test_proteins), residues=len(test))
+    return scores
+
+
+def cross_validate(path, k=FOLDS, model='mlp', processes=None, threads=None,
+                   cache_dir=CACHE_DIR, stages=(), seed=42):
+    """Protein-grouped k-fold scores of `model` ('mlp' or 'xgboost') on `path`.
+
+    Runs up to `processes` folds at once (default: all of them), each with
+    `threads` threads (default: an even share of the CPUs). Returns one dict
+    of scores per fold.
+    """
+    if model not in TRAINERS:
+        raise ValueError('unknown model {!r}, expected one of {}'.format(model, sorted(TRAINERS)))
+
+    features = model_inputs(path, model, cache_dir, stages)[0]
+    folds = protein_folds(features.index, k, seed)
+
+    processes = processes or min(k, os.cpu_count())
+    threads = threads or max(os.cpu_count() // processes, 1)
+
+    # Fresh interpreters that start with the thread limits in their
+    # environment, before they import numpy or anything else.
+    context = multiprocessing.get_context('spawn')
+    with limited_threads(threads), ProcessPoolExecutor(processes, mp_context=context) as pool:
+        jobs = [pool.submit(_run_fold, path, proteins, model, cache_dir, stages, seed, threads)
+                for proteins in folds]
+        return [job.result() for job in jobs]
+
+
+def summarize(scores):
+    """Mean and standard deviation of each metric across folds."""
+    return {name: (np.mean([fold[name] for fold in scores]), np.std([fold[name] for fold in scores]))
+            for name in ('roc_auc', 'pr_auc')}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Protein-grouped cross validation.")
+    parser.add_argument("path", nargs="?", default="af2_dataset_training_labeled.csv")
+    parser.add_argument("--folds", type=int, default=FOLDS)
+    parser.add_argument("--model", choices=sorted(TRAINERS), default="mlp")
+    parser.add_argument("--processes", type=int, help="folds trained at once")
+    parser.add_argument("--threads", type=int, help="math threads per fold")
+    args = parser.parse_args()
+
+    scores = cross_validate(args.path, args.folds, args.model, args.processes, args.threads)
+    for number, fold in enumerate(scores):
+        print('Fold {}: {} proteins, {} residues, ROC-AUC {:.4f}, PR-AUC {:.4f}'.format(
+            number, fold['proteins'], fold['residues'], fold['roc_auc'], fold['pr_auc']))
+    for name, (mean, std) in summarize(scores).items():
+        print('{}: {:.4f} +/- {:.4f}'.format(name.upper().replace('_', '-'), mean, std))
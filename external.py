@@ -0,0 +1,58 @@
+##############################################################
+###                                                        ###
+###             CYCLICA ALPHAFOLD 2 CHALLENGE              ###
+###                                                        ###
+##############################################################
+
+# external.py trains XGBoost on more residues than fit in memory.
+#
+# The training rows are written out as shard files (shards.py), ideally as
+# the uint8 bin codes from binning.py. ShardBatches hands XGBoost one shard
+# at a time through its DataIter interface, and XGBoost keeps its own
+# compressed pages in an on-disk cache next to the shards. Peak memory is
+# about one shard plus the tree being built, whatever the corpus size.
+
+import os
+
+import numpy as np
+import xgboost
+
+from binning import MAX_BIN
+from shards import shard_prefixes
+
+ROUNDS = 100
+
+
+class ShardBatches(xgboost.DataIter):
+    """XGBoost data iterator over the shards in `directory`, in order."""
+
+    def __init__(self, directory, cache_prefix=None):
+        self.prefixes = shard_prefixes(directory)
+        if not self.prefixes:
+            raise ValueError('no shards in {}'.format(directory))
+        self.position = 0
+        super().__init__(cache_prefix=cache_prefix or os.path.join(directory, 'xgb-cache'))
+
+    def next(self, input_data):
+        if self.position == len(self.prefixes):
+            return 0
+        prefix = self.prefixes[self.position]
+        input_data(data=np.load(prefix + '-parameters.npy', mmap_mode='r'),
+                   label=np.load(prefix + '-label.npy'))
+        self.position += 1
+        return 1
+
+    def reset(self):
+        self.position = 0
+
+
+def train_external(directory, threads=None, rounds=ROUNDS, max_bin=MAX_BIN, seed=42, **params):
+    """Train an XGBoost Booster on the shards in `directory` in external memory.
+
+    `params` are XGBoost training parameters, added to binary:logistic with
+    the hist tree method.
+    """
+    params = dict({'objective': 'binary:logistic', 'tree_method': 'hist', 'max_bin': max_bin,
+                   'seed': seed, 'nthread': threads or os.cpu_count()}, **params)
+    matrix = xgboost.DMatrix(ShardBatches(directory))
+    return xgboost.train(params, matrix, num_boost_round=rounds)
@@ -0,0 +1,214 @@
+##############################################################
+###                                                        ###
+###             CYCLICA ALPHAFOLD 2 CHALLENGE              ###
+###                                                        ###
+##############################################################
+
+# featurizer.py turns the AF2 residue table into numbers our models can use.
+# It is shared by alpha.py, cyclica.py, example.py and testing.py.
+
+from collections import namedtuple
+
+import numpy as np
+
+# Making a combination of pKa1, pKa2, pKa3, and pl values for each amino acid. For reference pKa1= α-carboxyl group, pKa2 = α-ammonium ion, and pKa3 = side chain group. Also, pl is just the isoelectronic point. Researach from the University of Calgary: https://www.chem.ucalgary.ca/courses/350/Carey5th/Ch27/ch27-1-4-2.html
+
+# Also adds a hydrophilicity value for each amino acid. Research for values from IMGT: https://www.imgt.org/IMGTeducation/Aide-memoire/_UK/aminoacids/IMGTclasses.html
+
+RESIDUE_PROPERTY_NAMES = ('pKa1', 'pKa2', 'pKa3', 'pI', 'hydrophilicity')
+
+RESIDUE_PROPERTIES = {
+    #      pKa1  pKa2   pKa3   pI     hydrophilicity
+    'A': (2.34, 9.69, 0, 6.00, 1.8),
+    'C': (1.96, 8.18, 0, 5.07, 2.5),
+    'D': (1.88, 9.60, 3.65, 2.77, -3.5),
+    'E': (2.19, 9.67, 4.25, 3.22, -3.5),
+    'F': (1.83, 9.13, 0, 5.48, 2.8),
+    'G': (2.34, 9.60, 0, 5.97, -0.4),
+    'H': (1.82, 9.17, 6.00, 7.59, -3.2),
+    'I': (2.36, 9.60, 0, 5.98, 4.5),
+    'K': (2.18, 8.95, 10.53, 9.74, -3.9),
+    'L': (2.36, 9.60, 0, 5.98, 3.8),
+    'M': (2.28, 9.21, 0, 5.74, 1.9),
+    'N': (2.02, 8.80, 0, 5.41, -3.5),
+    'P': (1.99, 10.60, 0, 6.30, -1.6),
+    'Q': (2.17, 9.13, 0, 5.65, -3.5),
+    'R': (2.17, 9.04, 12.48, 10.76, -4.5),
+    'S': (2.21, 9.15, 0, 5.68, -0.8),
+    'T': (2.09, 9.10, 0, 5.60, -0.7),
+    'V': (2.32, 9.62, 0, 5.96, 4.2),
+    'W': (2.83, 9.39, 0, 5.89, -0.9),
+    'Y': (2.20, 9.11, 0, 5.66, -1.3),
+}
+
+RESIDUE_CODES = tuple(RESIDUE_PROPERTIES)
+
+# One row per residue code, in RESIDUE_CODES order.
+
+_PROPERTY_TABLE = np.array([RESIDUE_PROPERTIES[code] for code in RESIDUE_CODES],
+                           dtype=np.float32)
+
+# Byte value of a one-letter code -> row in _PROPERTY_TABLE, -1 for anything unknown.
+
+_CODE_LOOKUP = np.full(256, -1, dtype=np.intp)
+for _row, _code in enumerate(RESIDUE_CODES):
+    _CODE_LOOKUP[ord(_code)] = _row
+
+
+def residue_indices(sequence):
+    """Map one-letter residue codes to rows of the property table.
+
+    Raises ValueError naming every unknown code, so the feature matrix can
+    never end up shorter than the frame it came from.
+    """
+    # Two bytes per code so multi-letter entries (and NaN, which reads as 'na')
+    # are caught instead of being truncated to their first letter.
+
+    codes = np.asarray(sequence, dtype='S2').reshape(-1)
+    code_bytes = codes.view(np.uint8).reshape(-1, 2)
+    rows = _CODE_LOOKUP[code_bytes[:, 0]]
+
+    unknown = (rows < 0) | (code_bytes[:, 1] != 0)
+    if unknown.any():
+        bad, counts = np.unique(codes[unknown], return_counts=True)
+        report = ', '.join('{!r} x{}'.format(code.decode(), count)
+                           for code, count in zip(bad, counts))
+        raise ValueError('Unknown residue codes in annotation_sequence: ' + report)
+
+    return rows
+
+
+def residue_properties(sequence):
+    """Return an (n, 5) array of pKa1, pKa2, pKa3, pI and hydrophilicity."""
+    return _PROPERTY_TABLE[residue_indices(sequence)]
+
+
+# Declarative feature schema.
+#
+# Each entry names one source column of the AF2 residue table, the dtype it is
+# read out of pandas as, an optional transform, and the names of the output
+# columns it produces. The order of FEATURE_SCHEMA is the column order of the
+# `parameters` matrix our models are trained on, so do not reorder it without
+# retraining model.h5.
+
+FeatureColumn = namedtuple('FeatureColumn', ['source', 'dtype', 'transform', 'names'])
+
+
+def _value(column):
+    return FeatureColumn(column, np.float32, None, (column,))
+
+
+def _flag(column):
+    # DSSP flags are stored as True/False, read them out as 0/1.
+    return FeatureColumn(column, bool, None, (column,))
+
+
+FEATURE_SCHEMA = (
+    FeatureColumn('annotation_sequence', object, residue_properties, RESIDUE_PROPERTY_NAMES),
+    _value('feat_PHI'),
+    _value('feat_PSI'),
+    _value('feat_TAU'),
+    _value('feat_THETA'),
+    _value('feat_BBSASA'),
+    _value('feat_SCSASA'),
+    _value('feat_pLDDT'),
+    _flag('feat_DSSP_H'),
+    _flag('feat_DSSP_B'),
+    _flag('feat_DSSP_E'),
+    _flag('feat_DSSP_G'),
+    _flag('feat_DSSP_I'),
+    _flag('feat_DSSP_T'),
+    _flag('feat_DSSP_S'),
+    _value('feat_DSSP_6'),
+    _value('feat_DSSP_7'),
+    _value('feat_DSSP_8'),
+    _value('feat_DSSP_9'),
+    _value('feat_DSSP_10'),
+    _value('feat_DSSP_11'),
+    _value('feat_DSSP_12'),
+    _value('feat_DSSP_13'),
+)
+
+LABEL_COLUMN = 'y_Ligand'
+
+# Bump FEATURE_VERSION whenever the schema, the residue table or a transform
+# changes what build_parameters() returns, or the cache stores different
+# arrays; it keys the on-disk feature cache.
+
+FEATURE_VERSION = 5
+
+FEATURE_NAMES = tuple(name for feature in FEATURE_SCHEMA for name in feature.names)
+
+# Feature stages add columns computed from several source columns at once,
+# e.g. spatial neighbourhoods (neighborhood.py). `build(data)` returns an
+# (n, len(names)) array and `columns` lists the source columns it reads.
+# Stages are opt-in, since model.h5 was trained on FEATURE_SCHEMA alone.
+
+FeatureStage = namedtuple('FeatureStage', ['build', 'names', 'columns'])
+
+
+def feature_names(schema=FEATURE_SCHEMA, stages=()):
+    """Names of the `parameters` columns, in order."""
+    return tuple(name for part in tuple(schema) + tuple(stages) for name in part.names)
+
+
+def feature_columns(schema=FEATURE_SCHEMA, stages=()):
+    """Source columns the schema and stages read, without repeats."""
+    columns = [feature.source for feature in schema]
+    for stage in stages:
+        columns += [column for column in stage.columns if column not in columns]
+    return columns
+
+
+def feature_values(column, feature):
+    """Read one schema feature out of its source column and transform it."""
+    if feature.transform is None:
+        return column.to_numpy(dtype=feature.dtype)
+
+    # Categorical columns (see loader.py) only need the transform applied to
+    # each category once; rows then gather their category's result by code.
+    # Missing values have code -1 and go through the slow path so the
+    # transform gets to report them.
+
+    if hasattr(column, 'cat'):
+        codes = column.cat.codes.to_numpy()
+        if not (codes < 0).any():
+            categories = column.cat.categories.to_numpy(dtype=feature.dtype)
+            return feature.transform(categories)[codes]
+
+    return feature.transform(column.to_numpy(dtype=feature.dtype))
+
+
+def build_parameters(data, schema=FEATURE_SCHEMA, out=None, stages=()):
+    """Project `data` through the schema into the `parameters` matrix.
+
+    The matrix is a C-contiguous float32 array, allocated once and filled one
+    schema column at a time, so Keras and XGBoost can take it without another
+    conversion. Pass `out` to fill an existing (len(data), n_features) float32
+    buffer instead, e.g. a slice of a memory-mapped file. Columns from
+    `stages` follow the schema columns.
+    """
+    n_features = len(feature_names(schema, stages))
+    if out is None:
+        out = np.empty((len(data), n_features), dtype=np.float32)
+    elif out.shape != (len(data), n_features) or out.dtype != np.float32:
+        raise ValueError('out must be a float32 array of shape {}'.format((len(data), n_features)))
+
+    start = 0
+    for feature in schema:
+        stop = start + len(feature.names)
+        values = feature_values(data[feature.source], feature)
+        out[:, start:stop] = values.reshape(len(data), stop - start)
+        start = stop
+
+    for stage in stages:
+        stop = start + len(stage.names)
+        out[:, start:stop] = stage.build(data)
+        start = stop
+
+    return out
+
+
+def build_label(data):
+    """Return y_Ligand as an (n, 1) float32 array of 0/1."""
+    return data[LABEL_COLUMN].to_numpy(dtype=np.float32).reshape(-1, 1)
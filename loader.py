@@ -0,0 +1,192 @@
+##############################################################
+###                                                        ###
+###             CYCLICA ALPHAFOLD 2 CHALLENGE              ###
+###                                                        ###
+##############################################################
+
+# loader.py reads the AF2 residue CSVs (plain or .csv.gz) with only the columns
+# we use and with explicit, compact dtypes.
+#
+# pandas is imported by the functions that need it rather than up here, so
+# code that only opens cached features (and ProteinIndex) starts without it.
+
+from collections import namedtuple
+
+import numpy as np
+
+from featurizer import FEATURE_SCHEMA, LABEL_COLUMN, feature_columns
+
+# The challenge CSVs are written with their row id as an unnamed first column.
+
+ID_COLUMN = 'Unnamed: 0'
+
+ENTRY_COLUMNS = ['entry', 'entry_index']
+
+COORD_COLUMNS = ['coord_X', 'coord_Y', 'coord_Z']
+
+# Schema dtypes -> dtypes we ask read_csv for. Residue codes and entry ids only
+# take a handful of distinct values, so they are read as categoricals rather
+# than one Python string per row.
+
+_READ_DTYPES = {np.float32: np.float32, bool: bool, object: 'category'}
+
+COLUMN_DTYPES = {feature.source: _READ_DTYPES[feature.dtype]
+                 for feature in FEATURE_SCHEMA}
+COLUMN_DTYPES.update({'entry': 'category', 'entry_index': np.int32,
+                      LABEL_COLUMN: bool})
+COLUMN_DTYPES.update({column: np.float32 for column in COORD_COLUMNS})
+
+
+def residue_columns(labeled=True, stages=()):
+    """Columns load_residues() keeps, besides the row id."""
+    columns = feature_columns(stages=stages)
+    columns += [column for column in ENTRY_COLUMNS if column not in columns]
+    if labeled:
+        columns.append(LABEL_COLUMN)
+    return columns
+
+
+def _read_options(path, labeled, stages):
+    import pandas as pd
+    header = pd.read_csv(path, nrows=0).columns
+    if labeled is None:
+        labeled = LABEL_COLUMN in header
+
+    columns = residue_columns(labeled, stages)
+    missing = [column for column in columns if column not in header]
+    if missing:
+        raise ValueError('{} is missing columns: {}'.format(path, ', '.join(missing)))
+
+    index_col = None
+    if ID_COLUMN in header:
+        columns = [ID_COLUMN] + columns
+        index_col = ID_COLUMN
+
+    return dict(usecols=columns,
+                index_col=index_col,
+                dtype={column: COLUMN_DTYPES[column] for column in columns
+                       if column in COLUMN_DTYPES})
+
+
+def load_residues(path, labeled=None, stages=()):
+    """Read an AF2 residue table, pruned to the columns our models use.
+
+    `labeled` defaults to whether the file has a y_Ligand column. Columns
+    read by feature `stages` are kept as well. The row id becomes the index,
+    as with `pd.read_csv(path, index_col=0)`.
+    """
+    import pandas as pd
+    data = pd.read_csv(path, **_read_options(path, labeled, stages))
+    data.index.name = 'id'
+    return data
+
+
+def iter_residues(path, chunksize, labeled=None, stages=()):
+    """Like load_residues(), but yield the table `chunksize` rows at a time."""
+    import pandas as pd
+    with pd.read_csv(path, chunksize=chunksize, **_read_options(path, labeled, stages)) as reader:
+        for chunk in reader:
+            chunk.index.name = 'id'
+            yield chunk
+
+
+# Protein boundaries.
+#
+# Once residues are sorted by (entry, entry_index), every protein is a
+# contiguous run of rows. ProteinIndex records where each run starts, CSR
+# style: protein i (named entries[i]) is rows offsets[i]:offsets[i + 1]. Per
+# protein work is then a slice instead of a pandas groupby.
+
+
+class ProteinIndex(namedtuple('ProteinIndex', ['entries', 'offsets'])):
+    """Entry ids (sorted) and row offsets of each protein in sorted rows."""
+
+    __slots__ = ()
+
+    @property
+    def n_proteins(self):
+        return len(self.entries)
+
+    def sizes(self):
+        return np.diff(self.offsets)
+
+    def rows(self, protein):
+        """Slice of the rows belonging to protein number `protein`."""
+        return slice(int(self.offsets[protein]), int(self.offsets[protein + 1]))
+
+    def rows_of(self, entry):
+        """Slice of the rows belonging to the protein with id `entry`."""
+        protein = np.searchsorted(self.entries, entry)
+        if protein == self.n_proteins or self.entries[protein] != entry:
+            raise KeyError(entry)
+        return self.rows(protein)
+
+    def protein_rows(self, proteins):
+        """Row numbers of all the given proteins, one protein after another."""
+        proteins = np.asarray(proteins, dtype=np.int64)
+        sizes = self.offsets[proteins + 1] - self.offsets[proteins]
+        ends = np.cumsum(sizes)
+        total = int(ends[-1]) if len(ends) else 0
+        return np.arange(total) + np.repeat(self.offsets[proteins] - (ends - sizes), sizes)
+
+    def protein_of_rows(self):
+        """Protein number of every row."""
+        return np.repeat(np.arange(self.n_proteins), self.sizes())
+
+    def positions(self):
+        """Position of every row within its own protein."""
+        return np.arange(self.offsets[-1]) - np.repeat(self.offsets[:-1], self.sizes())
+
+
+def entry_order(data):
+    """Return (order, index) for putting `data` in (entry, entry_index) order.
+
+    `data.iloc[order]` is sorted, and `index` is the ProteinIndex over the
+    sorted rows. `order` is slice(None) when `data` is already sorted, so
+    indexing with it costs nothing.
+    """
+    entry = data['entry']
+    if hasattr(entry, 'cat'):
+        codes, categories = entry.cat.codes.to_numpy(), entry.cat.categories
+    else:
+        import pandas as pd
+        codes, categories = pd.factorize(entry)
+    if (codes < 0).any():
+        raise ValueError('{} residues have no entry'.format(int((codes < 0).sum())))
+
+    # Rank the ids by name so proteins come out in entry order.
+    names = np.asarray(categories, dtype=str)
+    by_name = np.argsort(names, kind='stable')
+    rank = np.empty(len(names), dtype=np.int64)
+    rank[by_name] = np.arange(len(names))
+    key = rank[codes]
+    position = data['entry_index'].to_numpy()
+
+    in_order = ((key[1:] > key[:-1]) |
+                ((key[1:] == key[:-1]) & (position[1:] >= position[:-1])))
+    if in_order.all():
+        order = slice(None)
+    else:
+        order = np.lexsort((position, key))
+        key = key[order]
+
+    starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]]) if len(key) else key
+    index = ProteinIndex(entries=names[by_name][key[starts]],
+                         offsets=np.r_[starts, len(key)].astype(np.int64))
+    return order, index
+
+
+def sort_by_entry(data):
+    """Return `data` in (entry, entry_index) order, its ProteinIndex, and the
+    original position of every sorted row."""
+    order, index = entry_order(data)
+    rows = np.arange(len(data))[order]
+    if not isinstance(order, slice):
+        data = data.iloc[order]
+    return data, index, rows
+
+
+def load_proteins(path, labeled=None, stages=()):
+    """load_residues(), sorted by (entry, entry_index), plus its ProteinIndex."""
+    data, index, _ = sort_by_entry(load_residues(path, labeled, stages))
+    return data, index
@@ -0,0 +1,102 @@
+##############################################################
+###                                                        ###
+###             CYCLICA ALPHAFOLD 2 CHALLENGE              ###
+###                                                        ###
+##############################################################
+
+# models.py builds and trains the two classifiers we compare: the Keras
+# network from cyclica.py and the XGBoost model from example.py. Both train
+# on a subset of rows of a (possibly memory-mapped) feature matrix and are
+# scored through predict_probabilities().
+#
+# TensorFlow and XGBoost are imported inside the functions that need them, so
+# a worker process can cap its thread counts before either library starts.
+
+import numpy as np
+
+from binning import MAX_BIN
+from sampling import BalancedBatches
+
+EPOCHS = 8
+
+
+# Defaults are the hand-picked settings from cyclica.py and example.py; the
+# keyword arguments below are what search.py tunes.
+
+UNITS = (100, 100, 25)
+
+
+def build_mlp(n_features, threads=None, units=UNITS, optimizer='rmsprop', learning_rate=None):
+    """Return the compiled binding network for `n_features` inputs.
+
+    `units` sizes the three hidden layers (sigmoid, relu and linear).
+    """
+    import tensorflow as tf
+
+    if threads:
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+
+    # Initializing the ANN
+
+    ann = tf.keras.models.Sequential()
+
+    # Add the input layer and first hidden layer
+
+    ann.add(tf.keras.layers.Dense(units=units[0], activation="sigmoid",
+            input_shape=(n_features,)))
+    ann.add(tf.keras.layers.Dense(units=units[1], activation="relu"))
+    ann.add(tf.keras.layers.Dense(units=units[2], activation=None))
+
+    # Add the output layer
+
+    ann.add(tf.keras.layers.Dense(units=1, activation='sigmoid'))
+
+    if learning_rate is not None:
+        optimizer = tf.keras.optimizers.get({'class_name': optimizer,
+                                             'config': {'learning_rate': learning_rate}})
+
+    ann.compile(optimizer=optimizer, loss='binary_crossentropy',
+                metrics=['accuracy'])
+    return ann
+
+
+def train_mlp(parameters, label, rows, seed=42, threads=None, epochs=EPOCHS, batch_size=64,
+              verbose=0, **network):
+    """Train the network on `rows` with class-balanced batches.
+
+    Extra keyword arguments go to build_mlp().
+    """
+    ann = build_mlp(parameters.shape[1], threads, **network)
+    batches = BalancedBatches(parameters, label, rows=rows, batch_size=batch_size, seed=seed)
+    ann.fit(iter(batches), steps_per_epoch=batches.steps_per_epoch, epochs=epochs,
+            verbose=verbose)
+    return ann
+
+
+def train_xgboost(parameters, label, rows, seed=42, threads=None, tree_method='hist',
+                  max_bin=MAX_BIN, **params):
+    """Fit the XGBoost classifier on `rows`; `params` go to XGBClassifier.
+
+    Pass the bin codes from binning.load_bins() as `parameters` so the
+    histogram is built from data that is already binned.
+    """
+    import xgboost
+
+    xgb = xgboost.XGBClassifier(n_jobs=threads, random_state=seed, tree_method=tree_method,
+                                max_bin=max_bin, **params)
+    xgb.fit(parameters[rows], np.asarray(label)[rows].reshape(-1))
+    return xgb
+
+
+TRAINERS = {'mlp': train_mlp, 'xgboost': train_xgboost}
+
+
+def predict_probabilities(model, parameters):
+    """Binding probability of every row of `parameters`, as a flat array."""
+    if hasattr(model, 'predict_proba'):
+        return model.predict_proba(parameters)[:, 1]
+    if hasattr(model, 'inplace_predict'):
+        # A bare XGBoost Booster, e.g. from external.train_external().
+        return model.inplace_predict(parameters)
+    return model.predict(parameters, verbose=0).reshape(-1)
@@ -0,0 +1,96 @@
+##############################################################
+###                                                        ###
+###             CYCLICA ALPHAFOLD 2 CHALLENGE              ###
+###                                                        ###
+##############################################################
+
+# neighborhood.py adds spatial context to each residue. Binding sites are
+# pockets, so what surrounds a residue in 3-D says a lot about whether it binds.
+#
+# For every protein (`entry`) we build a KD-tree on the residue coordinates
+# and collect all residue pairs within the largest radius in one query, which
+# is O(n log n + pairs) instead of all-pairs distances. For each radius we then
+# aggregate over the neighbours (not counting the residue itself):
+#
+#   nb<r>_count -> Number of residues within r angstroms.
+#   nb<r>_sasa -> Mean solvent accessible surface area (BBSASA + SCSASA).
+#   nb<r>_pLDDT -> Mean AlphaFold2 confidence.
+#   nb<r>_hydrophobicity -> Mean hydrophilicity value from the residue property table.
+#
+# Residues with no neighbours inside a radius take their own value for the means.
+
+from functools import partial
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from featurizer import FEATURE_SCHEMA, RESIDUE_PROPERTY_NAMES, FeatureStage, feature_values
+from loader import COORD_COLUMNS, entry_order
+
+RADII = (6.0, 10.0, 14.0)
+
+AGGREGATES = ('count', 'sasa', 'pLDDT', 'hydrophobicity')
+
+_RESIDUE_FEATURE = FEATURE_SCHEMA[0]
+_HYDROPHOBICITY = RESIDUE_PROPERTY_NAMES.index('hydrophilicity')
+
+
+def neighborhood_names(radii=RADII):
+    return tuple('nb{:g}_{}'.format(radius, aggregate)
+                 for radius in radii for aggregate in AGGREGATES)
+
+
+def _protein_neighborhood(coords, values, radii):
+    n = len(coords)
+    out = np.empty((n, len(radii), len(AGGREGATES)), dtype=np.float32)
+
+    pairs = cKDTree(coords).query_pairs(max(radii), output_type='ndarray')
+    first, second = pairs[:, 0], pairs[:, 1]
+    distance = np.linalg.norm(coords[first] - coords[second], axis=1)
+
+    for k, radius in enumerate(radii):
+        close = distance <= radius
+        # Every pair counts once for each of its two residues.
+        centre = np.concatenate((first[close], second[close]))
+        neighbour = np.concatenate((second[close], first[close]))
+
+        count = np.bincount(centre, minlength=n)
+        out[:, k, 0] = count
+        for v in range(values.shape[1]):
+            total = np.bincount(centre, weights=values[neighbour, v], minlength=n)
+            out[:, k, v + 1] = np.where(count > 0, total / np.maximum(count, 1), values[:, v])
+
+    return out.reshape(n, len(radii) * len(AGGREGATES))
+
+
+def neighborhood_features(data, radii=RADII):
+    """Return the (n, 4 * len(radii)) neighbourhood aggregates for `data`."""
+    radii = sorted(radii)
+    order, index = entry_order(data)
+
+    coords = data[COORD_COLUMNS].to_numpy(dtype=np.float64)[order]
+    values = np.column_stack((
+        data['feat_BBSASA'].to_numpy(dtype=np.float64) + data['feat_SCSASA'].to_numpy(dtype=np.float64),
+        data['feat_pLDDT'].to_numpy(dtype=np.float64),
+        feature_values(data[_RESIDUE_FEATURE.source], _RESIDUE_FEATURE)[:, _HYDROPHOBICITY],
+    ))[order]
+
+    grouped = np.empty((len(data), len(radii) * len(AGGREGATES)), dtype=np.float32)
+    for protein in range(index.n_proteins):
+        rows = index.rows(protein)
+        grouped[rows] = _protein_neighborhood(coords[rows], values[rows], radii)
+
+    if isinstance(order, slice):
+        return grouped
+    out = np.empty_like(grouped)
+    out[order] = grouped
+    return out
+
+
+def neighborhood_stage(radii=RADII):
+    """Feature stage adding neighbourhood aggregates, for build_parameters(stages=...)."""
+    radii = tuple(sorted(radii))
+    return FeatureStage(build=partial(neighborhood_features, radii=radii),
+                        names=neighborhood_names(radii),
+                        columns=COORD_COLUMNS + ['feat_BBSASA', 'feat_SCSASA', 'feat_pLDDT',
+                                                 _RESIDUE_FEATURE.source, 'entry'])
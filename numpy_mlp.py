@@ -0,0 +1,120 @@
+##############################################################
+###                                                        ###
+###             CYCLICA ALPHAFOLD 2 CHALLENGE              ###
+###                                                        ###
+##############################################################
+
+# numpy_mlp.py runs the trained network without TensorFlow.
+#
+# The model is four Dense layers, so a forward pass is four matrix products
+# and their activations. export_weights() pulls the kernels, biases and
+# activation names out of model.h5 once (this step does need TensorFlow) into
+# a small .npz file. NumpyMLP loads that file and predicts in float32 batches,
+# matching Keras to within float rounding, so scoring workers and command line
+# tools only need NumPy.
+#
+#   python numpy_mlp.py --model model.h5 --output model.npz --check af2_dataset_training_labeled.csv
+
+import argparse
+
+import numpy as np
+
+BATCH_ROWS = 65536
+
+
+def _sigmoid(x):
+    # tanh form: no overflow warnings for large negative inputs.
+    return 0.5 * (1 + np.tanh(0.5 * x))
+
+
+def _relu(x):
+    return np.maximum(x, 0, out=x)
+
+
+def _linear(x):
+    return x
+
+
+ACTIVATIONS = {'sigmoid': _sigmoid, 'relu': _relu, 'linear': _linear}
+
+
+def export_weights(model_path='model.h5', output='model.npz'):
+    """Write the Dense layers of the Keras model at `model_path` to `output`."""
+    from tensorflow.keras.models import load_model
+
+    arrays = {}
+    dense = [layer for layer in load_model(model_path).layers if layer.get_weights()]
+    for number, layer in enumerate(dense):
+        kernel, bias = layer.get_weights()
+        activation = layer.get_config().get('activation', 'linear')
+        if activation not in ACTIVATIONS:
+            raise ValueError('layer {} has unsupported activation {!r}'.format(layer.name, activation))
+        arrays['kernel{}'.format(number)] = kernel.astype(np.float32)
+        arrays['bias{}'.format(number)] = bias.astype(np.float32)
+        arrays['activation{}'.format(number)] = np.array(activation)
+
+    np.savez(output, layers=np.array(len(dense)), **arrays)
+    return output
+
+
+class NumpyMLP:
+    """Feed-forward network from an export_weights() file."""
+
+    def __init__(self, kernels, biases, activations):
+        self.kernels = [np.ascontiguousarray(kernel, dtype=np.float32) for kernel in kernels]
+        self.biases = [np.asarray(bias, dtype=np.float32) for bias in biases]
+        self.activations = list(activations)
+
+    @classmethod
+    def load(cls, path):
+        """Load an export_weights() file, or a quantized one from quantized.py."""
+        with np.load(path) as arrays:
+            layers = range(int(arrays['layers']))
+            kernels = []
+            for i in layers:
+                kernel = arrays['kernel{}'.format(i)].astype(np.float32)
+                if 'scale{}'.format(i) in arrays:
+                    # int8 kernel with one scale per output unit.
+                    kernel *= arrays['scale{}'.format(i)]
+                kernels.append(kernel)
+            return cls(kernels,
+                       [arrays['bias{}'.format(i)] for i in layers],
+                       [str(arrays['activation{}'.format(i)]) for i in layers])
+
+    def _forward(self, x):
+        for kernel, bias, activation in zip(self.kernels, self.biases, self.activations):
+            x = x @ kernel
+            x += bias
+            x = ACTIVATIONS[activation](x)
+        return x
+
+    def predict(self, parameters, batch_size=BATCH_ROWS, verbose=0):
+        """(n, 1) float32 probabilities, like Keras' model.predict()."""
+        out = np.empty((len(parameters), self.kernels[-1].shape[1]), dtype=np.float32)
+        for start in range(0, len(parameters), batch_size):
+            batch = np.asarray(parameters[start:start + batch_size], dtype=np.float32)
+            out[start:start + len(batch)] = self._forward(batch)
+        return out
+
+    predict_on_batch = predict
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Export model.h5 for TensorFlow-free scoring.")
+    parser.add_argument("--model", default="model.h5")
+    parser.add_argument("--output", default="model.npz")
+    parser.add_argument("--check", metavar="CSV",
+                        help="compare against Keras on the features of this CSV")
+    args = parser.parse_args()
+
+    export_weights(args.model, args.output)
+    print('Wrote {}'.format(args.output))
+
+    if args.check:
+        from tensorflow.keras.models import load_model
+        from cache import load_features
+
+        parameters = load_features(args.check).parameters
+        keras = load_model(args.model).predict(parameters, batch_size=BATCH_ROWS)
+        difference = np.abs(NumpyMLP.load(args.output).predict(parameters) - keras).max()
+        print('Largest difference from Keras: {:.2e}'.format(difference))
@@ -0,0 +1,65 @@
+##############################################################
+###                                                        ###
+###             CYCLICA ALPHAFOLD 2 CHALLENGE              ###
+###                                                        ###
+##############################################################
+
+# parallel.py spreads featurization over a pool of worker processes.
+#
+# The residue table is cut into shards of whole proteins (a protein is never
+# split, so per-protein stages see exactly what they would in one process).
+# Each worker featurizes its shard and writes the rows straight into a shared
+# memory-mapped .npy file at their original positions, so the finished matrix
+# never travels back through the pool and comes out in the input's row order.
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from featurizer import FEATURE_SCHEMA, build_parameters, feature_names
+from loader import entry_order
+
+# Shards per worker; more than one evens out proteins of very different sizes.
+
+SHARDS_PER_PROCESS = 4
+
+
+def shard_rows(data, n_shards):
+    """Split the rows of `data` into about `n_shards` groups of whole proteins
+    with similar residue counts. Returns one array of row positions per shard."""
+    order, index = entry_order(data)
+    rows = np.arange(len(data))[order]
+
+    targets = np.linspace(0, len(data), n_shards + 1)[1:-1]
+    cuts = np.unique(np.r_[0, np.searchsorted(index.offsets, targets), index.n_proteins])
+    return [rows[index.offsets[start]:index.offsets[stop]]
+            for start, stop in zip(cuts[:-1], cuts[1:])]
+
+
+def _featurize_shard(shard, rows, path, schema, stages):
+    out = np.load(path, mmap_mode='r+')
+    out[rows] = build_parameters(shard, schema, stages=stages)
+    out.flush()
+    return len(rows)
+
+
+def build_parameters_parallel(data, path, schema=FEATURE_SCHEMA, stages=(), processes=None):
+    """Featurize `data` across `processes` workers into the .npy file `path`.
+
+    Gives exactly the same matrix as build_parameters(data, schema,
+    stages=stages), returned memory-mapped from `path`.
+    """
+    processes = processes or os.cpu_count()
+    shape = (len(data), len(feature_names(schema, stages)))
+    out = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32, shape=shape)
+    out.flush()
+
+    shards = shard_rows(data, processes * SHARDS_PER_PROCESS) if len(data) else []
+    with ProcessPoolExecutor(processes) as pool:
+        jobs = [pool.submit(_featurize_shard, data.iloc[rows], rows, path, schema, stages)
+                for rows in shards]
+        for job in jobs:
+            job.result()
+
+    return np.load(path, mmap_mode='r')
@@ -0,0 +1,110 @@
+##############################################################
+###                                                        ###
+###             CYCLICA ALPHAFOLD 2 CHALLENGE              ###
+###                                                        ###
+##############################################################
+
+# predcache.py remembers recent residue predictions, so popular proteins that
+# are queried again and again are answered without running the model.
+#
+# Each prediction is keyed by (entry, entry_index, feature hash). The feature
+# hash covers the residue's whole feature row, so a re-predicted structure or
+# a new feature version misses instead of serving a stale value. A cache
+# belongs to one model version; a new model gets a new cache. Entries are
+# evicted least recently used first once the cache holds `max_bytes` worth of
+# them. All misses of one call go to the model as one batch.
+
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from cache import file_digest
+
+# Bytes one cached prediction costs beyond its key and value objects: the
+# OrderedDict's linked-list node plus its hash table slot, with room for the
+# table's growth slack.
+
+NODE_BYTES = 128
+
+MAX_BYTES = 256 * 2 ** 20
+
+_PRIME = np.uint64(0x100000001b3)
+
+
+def row_hashes(parameters):
+    """64-bit hash of every row of `parameters`, from the float32 bit patterns."""
+    words = np.ascontiguousarray(parameters, dtype=np.float32).view(np.uint32)
+    hashes = np.full(len(words), 0xcbf29ce484222325, dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        for column in range(words.shape[1]):
+            hashes ^= words[:, column]
+            hashes *= _PRIME
+    return hashes
+
+
+def item_bytes(key, value):
+    """Memory one cached prediction takes: its key tuple and parts, value and node."""
+    return (sys.getsizeof(key) + sum(sys.getsizeof(part) for part in key)
+            + sys.getsizeof(value) + NODE_BYTES)
+
+
+def model_version(path):
+    """Version tag of the model file at `path`: a prefix of its content hash."""
+    return file_digest(path)[:16]
+
+
+class PredictionCache:
+    """LRU cache of residue probabilities in front of `predict`.
+
+    `predict` maps an (n, n_features) float32 array to n probabilities (any
+    shape that reshapes to n). Counters: hits, misses, evictions.
+    """
+
+    def __init__(self, predict, version, max_bytes=MAX_BYTES):
+        self.predict_rows = predict
+        self.version = version
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def predict(self, entries, positions, parameters):
+        """Probabilities of the residues (`entries`, `positions`) with `parameters`."""
+        keys = list(zip(np.asarray(entries, dtype=str).tolist(),
+                        np.asarray(positions).tolist(),
+                        row_hashes(parameters).tolist()))
+        probabilities = np.empty(len(keys), dtype=np.float32)
+        missing = []
+
+        with self.lock:
+            for row, key in enumerate(keys):
+                value = self.items.get(key)
+                if value is None:
+                    missing.append(row)
+                else:
+                    self.items.move_to_end(key)
+                    probabilities[row] = value
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            predicted = np.asarray(self.predict_rows(parameters[missing])).reshape(-1)
+            probabilities[missing] = predicted
+            with self.lock:
+                for row, value in zip(missing, predicted.tolist()):
+                    if keys[row] not in self.items:
+                        self.bytes += item_bytes(keys[row], value)
+                    self.items[keys[row]] = value
+                while self.bytes > self.max_bytes and len(self.items) > 1:
+                    self.bytes -= item_bytes(*self.items.popitem(last=False))
+                    self.evictions += 1
+
+        return probabilities
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'version': self.version, 'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'entries': len(self.items), 'bytes': self.bytes, 'hit_rate': self.hits / lookups if lookups else 0.0}
@@ -0,0 +1,87 @@
+##############################################################
+###                                                        ###
+###             CYCLICA ALPHAFOLD 2 CHALLENGE              ###
+###                                                        ###
+##############################################################
+
+# predstore.py keeps every protein's predictions on disk, keyed by what the
+# protein is rather than what it is called.
+#
+# A protein's key is the sha256 of its feature rows in chain order, so the
+# same AlphaFold2 model filed under another entry id in a later release gets
+# the same key, and any change to its structure or features gets a new one.
+# Predictions live in <store>/<model version>/<key[:2]>/<key>.npy, so a new
+# model starts an empty store of its own. Batch scoring looks every protein
+# up first and only runs the model over the ones that are missing.
+
+import hashlib
+import os
+
+import numpy as np
+
+from cache import CACHE_DIR, load_features
+
+PREDICTION_DIR = '.prediction_store'
+
+
+def protein_digests(parameters, index):
+    """sha256 hex digest of the feature rows of every protein in `index`."""
+    return [hashlib.sha256(np.ascontiguousarray(parameters[index.rows(protein)]).tobytes()).hexdigest()
+            for protein in range(index.n_proteins)]
+
+
+class PredictionStore:
+    """On-disk probabilities per (protein content hash, model version)."""
+
+    def __init__(self, version, directory=PREDICTION_DIR):
+        self.directory = os.path.join(directory, version)
+
+    def path(self, digest):
+        return os.path.join(self.directory, digest[:2], digest + '.npy')
+
+    def get(self, digest):
+        """Stored probabilities for `digest`, or None."""
+        try:
+            return np.load(self.path(digest))
+        except FileNotFoundError:
+            return None
+
+    def put(self, digest, probabilities):
+        path = self.path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Written under a temporary name first, so readers never see half a file.
+        staging = path + '.{}.tmp'.format(os.getpid())
+        with open(staging, 'wb') as out:
+            np.save(out, np.asarray(probabilities, dtype=np.float32))
+        os.replace(staging, path)
+
+
+def score_proteins(model, path, store, cache_dir=CACHE_DIR):
+    """Binding probabilities for every residue of `path`.
+
+    Proteins already in `store` (a PredictionStore) are read from it; the
+    rest are predicted in one batch and added. Returns (features,
+    probabilities, reused, scored): the cached Features of `path`, the
+    probabilities of its rows in their stored order, and protein counts.
+    """
+    features = load_features(path, cache_dir=cache_dir)
+    index = features.index
+    digests = protein_digests(features.parameters, index)
+
+    probabilities = np.empty(len(features.parameters), dtype=np.float32)
+    missing = []
+    for protein, digest in enumerate(digests):
+        stored = store.get(digest)
+        if stored is None or len(stored) != index.sizes()[protein]:
+            missing.append(protein)
+        else:
+            probabilities[index.rows(protein)] = stored
+
+    if missing:
+        rows = index.protein_rows(missing)
+        predicted = np.asarray(model.predict(features.parameters[rows])).reshape(-1)
+        probabilities[rows] = predicted
+        for protein in missing:
+            store.put(digests[protein], probabilities[index.rows(protein)])
+
+    return features, probabilities, index.n_proteins - len(missing), len(missing)
@@ -0,0 +1,158 @@
+##############################################################
+###                                                        ###
+###             CYCLICA ALPHAFOLD 2 CHALLENGE              ###
+###                                                        ###
+##############################################################
+
+# quantized.py makes reduced-precision copies of the binding network for
+# proteome-scale screening, and checks that they still rank residues as well.
+#
+# Two forms are written:
+#
+#   <model>-<precision>.npz -> The numpy_mlp.py weights with float16 kernels, or
+#       int8 kernels plus one float32 scale per output unit. NumPy has no
+#       int8 or float16 matrix kernels, so NumpyMLP widens these back to
+#       float32 on load: a 2-4x smaller file, float32 speed.
+#   <model>-<precision>.tflite -> A TensorFlow Lite model. For int8 its dense
+#       layers run on int8 weights in TFLite's CPU kernels, which is where
+#       the throughput gain comes from.
+#
+# <model> is the --output name of the float32 export (by default --model with
+# .npz in place of .h5), so exporting another model never overwrites model.npz.
+#
+# check() scores a labeled CSV with the float model and each quantized copy
+# and reports ROC-AUC, the largest probability change and rows per second.
+# For ROC-AUC to mean anything the CSV must hold residues the model was not
+# trained on; cyclica.py trains on a random 80% of all residues, so no part
+# of its training CSV qualifies.
+#
+#   python quantized.py --model model.h5 --precision int8 --check heldout_labeled.csv
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from numpy_mlp import BATCH_ROWS, NumpyMLP, export_weights
+
+PRECISIONS = ('float16', 'int8')
+
+
+def quantize_weights(weights, output, precision='int8'):
+    """Write a `precision` copy of the export_weights() file `weights` to `output`."""
+    if precision not in PRECISIONS:
+        raise ValueError('precision must be one of {}, got {!r}'.format(PRECISIONS, precision))
+
+    with np.load(weights) as source:
+        arrays = dict(source)
+    for i in range(int(arrays['layers'])):
+        kernel = arrays['kernel{}'.format(i)]
+        if precision == 'float16':
+            arrays['kernel{}'.format(i)] = kernel.astype(np.float16)
+        else:
+            # Symmetric per-unit scales: the largest weight of each unit maps to 127.
+            scale = np.abs(kernel).max(axis=0) / 127
+            scale[scale == 0] = 1
+            arrays['kernel{}'.format(i)] = np.round(kernel / scale).astype(np.int8)
+            arrays['scale{}'.format(i)] = scale.astype(np.float32)
+
+    np.savez(output, **arrays)
+    return output
+
+
+def export_tflite(model_path, output, precision='int8'):
+    """Convert the Keras model at `model_path` to a `precision` TFLite model."""
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(tf.keras.models.load_model(model_path))
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if precision == 'float16':
+        converter.target_spec.supported_types = [tf.float16]
+    with open(output, 'wb') as out:
+        out.write(converter.convert())
+    return output
+
+
+class TFLiteMLP:
+    """Batched predictor over a TFLite model, with Keras' predict() shape."""
+
+    def __init__(self, path, threads=None):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            from tensorflow.lite import Interpreter
+        self.interpreter = Interpreter(model_path=path, num_threads=threads)
+        self.input = self.interpreter.get_input_details()[0]['index']
+        self.output = self.interpreter.get_output_details()[0]['index']
+        self.batch = None
+
+    def predict(self, parameters, batch_size=BATCH_ROWS, verbose=0):
+        out = np.empty((len(parameters), 1), dtype=np.float32)
+        for start in range(0, len(parameters), batch_size):
+            batch = np.ascontiguousarray(parameters[start:start + batch_size], dtype=np.float32)
+            if len(batch) != self.batch:
+                self.interpreter.resize_tensor_input(self.input, batch.shape)
+                self.interpreter.allocate_tensors()
+                self.batch = len(batch)
+            self.interpreter.set_tensor(self.input, batch)
+            self.interpreter.invoke()
+            out[start:start + len(batch)] = self.interpreter.get_tensor(self.output)
+        return out
+
+
+def throughput(model, parameters, repeats=3):
+    """Best rows per second of model.predict() over `repeats` runs."""
+    best = np.inf
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model.predict(parameters)
+        best = min(best, time.perf_counter() - start)
+    return len(parameters) / best
+
+
+def check(reference, candidates, parameters, label):
+    """Compare `candidates` (name -> model) with the `reference` model.
+
+    Returns name -> dict of roc_auc, max_difference and rows_per_second, with
+    the reference itself under 'float32'.
+    """
+    from crossval import fold_scores
+
+    expected = reference.predict(parameters)
+    results = {}
+    for name, model in [('float32', reference)] + list(candidates.items()):
+        predicted = model.predict(parameters)
+        results[name] = {'roc_auc': fold_scores(label, predicted.reshape(-1))['roc_auc'],
+                         'max_difference': float(np.abs(predicted - expected).max()),
+                         'rows_per_second': throughput(model, parameters)}
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Quantize the binding network and check it.")
+    parser.add_argument("--model", default="model.h5")
+    parser.add_argument("--output", help="float32 export (default: --model with .npz); "
+                                         "the quantized copies are named after it")
+    parser.add_argument("--precision", choices=PRECISIONS, default="int8")
+    parser.add_argument("--check", metavar="CSV",
+                        help="labeled CSV of residues the model was not trained on")
+    parser.add_argument("--threads", type=int, help="TFLite interpreter threads")
+    args = parser.parse_args()
+
+    stem = os.path.splitext(args.output or args.model)[0]
+    weights = export_weights(args.model, stem + '.npz')
+    quantized = quantize_weights(weights, '{}-{}.npz'.format(stem, args.precision), args.precision)
+    lite = export_tflite(args.model, '{}-{}.tflite'.format(stem, args.precision), args.precision)
+    print('Wrote {} and {}'.format(quantized, lite))
+
+    if args.check:
+        from cache import load_features
+
+        features = load_features(args.check, labeled=True)
+        results = check(NumpyMLP.load(weights),
+                        {quantized: NumpyMLP.load(quantized), lite: TFLiteMLP(lite, args.threads)},
+                        features.parameters, features.label)
+        for name, result in results.items():
+            print('{:<24} ROC-AUC {roc_auc:.4f}  max diff {max_difference:.2e}  '
+                  '{rows_per_second:,.0f} rows/s'.format(name, **result))
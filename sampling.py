@@ -0,0 +1,70 @@
+##############################################################
+###                                                        ###
+###             CYCLICA ALPHAFOLD 2 CHALLENGE              ###
+###                                                        ###
+##############################################################
+
+# sampling.py rebalances training without copying the training set.
+#
+# Drug binding residues are a small minority of y_Ligand. Rather than
+# resampling the minority rows up to the majority count (which doubles the
+# matrix in memory, and leaks duplicates across a later train/test split),
+# BalancedBatches draws the row indices of each batch so that every class is
+# equally likely, and only gathers those rows. Split first, then hand the
+# training rows to the sampler.
+
+import numpy as np
+
+
+class BalancedBatches:
+    """Endless (x, y) batches drawn from `rows` with balanced classes.
+
+    `class_probabilities` maps each label value to the chance a batch slot
+    is filled from that class; the default is an even split. Rows are drawn
+    with replacement within their class, as oversampling would. Use with
+    `model.fit(iter(batches), steps_per_epoch=batches.steps_per_epoch)`.
+    """
+
+    def __init__(self, parameters, label, rows=None, batch_size=64, seed=42,
+                 class_probabilities=None):
+        self.parameters = parameters
+        self.label = np.asarray(label).reshape(-1)
+        self.batch_size = batch_size
+        self.random = np.random.default_rng(seed)
+
+        rows = np.arange(len(self.label)) if rows is None else np.asarray(rows)
+        classes = np.unique(self.label[rows])
+        self.class_rows = [rows[self.label[rows] == value] for value in classes]
+
+        if class_probabilities is None:
+            class_probabilities = {value: 1 / len(classes) for value in classes}
+        self.probabilities = np.array([class_probabilities[value] for value in classes], dtype=float)
+        self.probabilities /= self.probabilities.sum()
+
+    @property
+    def steps_per_epoch(self):
+        """Batches in one epoch: as many rows as an oversampled training set."""
+        largest = max(len(rows) for rows in self.class_rows)
+        return -(-largest * len(self.class_rows) // self.batch_size)
+
+    def batch_rows(self):
+        """Row indices of the next batch, sorted for memory-mapped reads."""
+        per_class = self.random.multinomial(self.batch_size, self.probabilities)
+        picks = [rows[self.random.integers(len(rows), size=count)]
+                 for rows, count in zip(self.class_rows, per_class)]
+        return np.sort(np.concatenate(picks))
+
+    def __iter__(self):
+        while True:
+            rows = self.batch_rows()
+            yield self.parameters[rows], self.label[rows]
+
+
+def class_weights(label, rows=None):
+    """Keras `class_weight` dict that weighs each class by its inverse frequency."""
+    label = np.asarray(label).reshape(-1)
+    if rows is not None:
+        label = label[rows]
+    classes, counts = np.unique(label, return_counts=True)
+    return {int(value): float(len(label) / (len(classes) * count))
+            for value, count in zip(classes, counts)}
@@ -0,0 +1,40 @@
+##############################################################
+###                                                        ###
+###             CYCLICA ALPHAFOLD 2 CHALLENGE              ###
+###                                                        ###
+##############################################################
+
+# scoring.py runs a trained model over an AF2 residue CSV a chunk of rows at a
+# time, so memory stays bounded no matter how big the input is.
+
+import numpy as np
+
+from featurizer import FEATURE_NAMES, build_parameters
+from loader import iter_residues
+from submission import SubmissionWriter
+
+CHUNK_SIZE = 200000
+
+
+def score_csv(model, path, output, chunksize=CHUNK_SIZE, threshold=0.5, cache=None,
+              probabilities=False, residues=False):
+    """Stream `path` through `model`, writing a submission file to `output`.
+
+    Each chunk is read, featurized into a reused float32 buffer, predicted and
+    written out before the next one is read. With a PredictionCache (see
+    predcache.py) over `model`, cached residues skip the model. `probabilities`
+    and `residues` add the Probability, entry and entry_index columns (see
+    submission.py). Returns the number of rows scored.
+    """
+    buffer = np.empty((chunksize, len(FEATURE_NAMES)), dtype=np.float32)
+
+    with SubmissionWriter(output, threshold, probabilities, residues) as writer:
+        for chunk in iter_residues(path, chunksize, labeled=False):
+            parameters = build_parameters(chunk, out=buffer[:len(chunk)])
+            if cache is None:
+                predicted = model.predict(parameters)
+            else:
+                predicted = cache.predict(chunk['entry'], chunk['entry_index'], parameters)
+            writer.write(chunk.index.to_numpy(), predicted, chunk['entry'], chunk['entry_index'])
+
+    return writer.rows
@@ -0,0 +1,155 @@
+##############################################################
+###                                                        ###
+###             CYCLICA ALPHAFOLD 2 CHALLENGE              ###
+###                                                        ###
+##############################################################
+
+# search.py tunes the hyperparameters of the Keras network or the XGBoost
+# model with successive halving.
+#
+# A batch of random configurations is trained on a small budget (a few
+# epochs, or a few boosting rounds). Only the best 1/ETA of them go on to the
+# next rung, with ETA times the budget, until the survivors train on the full
+# budget. Weak settings are dropped after a cheap run instead of a full one.
+#
+# Every trial in a rung runs at the same time in a worker process (see
+# crossval.py for the thread limits). Workers memory-map the cached feature
+# matrix, so the CSV is parsed and featurized once for the whole search.
+# Trials are scored on a held-out set of whole proteins.
+#
+#   python search.py --model xgboost --configs 27 af2_dataset_training_labeled.csv
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from cache import CACHE_DIR
+from crossval import fold_scores, limited_threads, model_inputs, protein_folds
+from models import TRAINERS, predict_probabilities
+
+ETA = 3
+
+# Choices each configuration is drawn from.
+
+SPACES = {
+    'mlp': {
+        'units': [(50, 50, 25), (100, 100, 25), (200, 100, 25), (200, 200, 50)],
+        'optimizer': ['rmsprop', 'adam'],
+        'learning_rate': [3e-4, 1e-3, 3e-3],
+        'batch_size': [64, 256, 1024],
+    },
+    'xgboost': {
+        'max_depth': [3, 4, 6, 8, 10],
+        'learning_rate': [0.03, 0.1, 0.3],
+        'min_child_weight': [1, 5, 20],
+        'subsample': [0.6, 0.8, 1.0],
+        'colsample_bytree': [0.6, 0.8, 1.0],
+    },
+}
+
+# The budget each model is halved over: (keyword, smallest, full).
+
+BUDGETS = {
+    'mlp': ('epochs', 1, 16),
+    'xgboost': ('n_estimators', 25, 675),
+}
+
+Trial = namedtuple('Trial', ['config', 'budget', 'scores'])
+
+
+def sample_configs(model, n, seed=42):
+    """Draw `n` random configurations from SPACES[model]."""
+    random = np.random.default_rng(seed)
+    space = SPACES[model]
+    return [{name: choices[random.integers(len(choices))] for name, choices in space.items()}
+            for _ in range(n)]
+
+
+def rung_budgets(model, eta=ETA):
+    """Budget of every rung, from the smallest up to the full budget."""
+    _, smallest, full = BUDGETS[model]
+    rungs = int(math.floor(math.log(full / smallest, eta) + 1e-9)) + 1
+    return [max(int(round(full / eta ** (rungs - 1 - rung))), smallest) for rung in range(rungs)]
+
+
+def _run_trial(path, valid_proteins, model, config, budget, cache_dir, stages, seed, threads):
+    features, matrix = model_inputs(path, model, cache_dir, stages)
+    valid = features.index.protein_rows(valid_proteins)
+    train = np.setdiff1d(np.arange(len(features.label)), valid, assume_unique=True)
+
+    keyword = BUDGETS[model][0]
+    fitted = TRAINERS[model](matrix, features.label, train, seed=seed,
+                             threads=threads, **dict(config, **{keyword: budget}))
+    return fold_scores(features.label[valid], predict_probabilities(fitted, matrix[valid]))
+
+
+def successive_halving(path, model='mlp', configs=None, eta=ETA, metric='pr_auc',
+                       processes=None, threads=None, cache_dir=CACHE_DIR, stages=(),
+                       holdout=5, seed=42):
+    """Search hyperparameters of `model` on `path`; return every Trial, best last.
+
+    `configs` is a list of keyword dicts for the trainer, or a number of random
+    ones to draw (default: enough to halve down to one). 1/`holdout` of the
+    proteins are held out for scoring by `metric` ('roc_auc' or 'pr_auc').
+    """
+    budgets = rung_budgets(model, eta)
+    if configs is None:
+        configs = eta ** (len(budgets) - 1)
+    if isinstance(configs, int):
+        configs = sample_configs(model, configs, seed)
+
+    features = model_inputs(path, model, cache_dir, stages)[0]
+    valid_proteins = protein_folds(features.index, holdout, seed)[0]
+
+    processes = processes or min(len(configs), os.cpu_count())
+    threads = threads or max(os.cpu_count() // processes, 1)
+
+    trials = []
+    context = multiprocessing.get_context('spawn')
+    with limited_threads(threads), ProcessPoolExecutor(processes, mp_context=context) as pool:
+        for rung, budget in enumerate(budgets):
+            jobs = [pool.submit(_run_trial, path, valid_proteins, model, config, budget,
+                                cache_dir, stages, seed, threads)
+                    for config in configs]
+            results = [Trial(config, budget, job.result()) for job, config in zip(jobs, configs)]
+            results.sort(key=lambda trial: trial.scores[metric])
+            trials.extend(results)
+
+            if rung < len(budgets) - 1:
+                keep = max(len(results) // eta, 1)
+                configs = [trial.config for trial in results[-keep:]]
+
+    return trials
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Successive halving hyperparameter search.")
+    parser.add_argument("path", nargs="?", default="af2_dataset_training_labeled.csv")
+    parser.add_argument("--model", choices=sorted(TRAINERS), default="mlp")
+    parser.add_argument("--configs", type=int, help="random configurations in the first rung")
+    parser.add_argument("--eta", type=int, default=ETA, help="keep the best 1/ETA of each rung")
+    parser.add_argument("--metric", choices=["roc_auc", "pr_auc"], default="pr_auc")
+    parser.add_argument("--processes", type=int, help="trials trained at once")
+    parser.add_argument("--threads", type=int, help="math threads per trial")
+    parser.add_argument("--output", help="write every trial to this JSON file")
+    args = parser.parse_args()
+
+    trials = successive_halving(args.path, args.model, args.configs, args.eta, args.metric,
+                                args.processes, args.threads)
+    for trial in trials:
+        print('{} {:>4}  ROC-AUC {:.4f}  PR-AUC {:.4f}  {}'.format(
+            BUDGETS[args.model][0], trial.budget, trial.scores['roc_auc'],
+            trial.scores['pr_auc'], trial.config))
+    print('Best: {}'.format(trials[-1].config))
+
+    if args.output:
+        with open(args.output, 'w') as out:
+            json.dump([{'config': trial.config, 'budget': trial.budget,
+                        'scores': {name: float(value) for name, value in trial.scores.items()}}
+                       for trial in trials], out, indent=2)
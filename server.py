@@ -0,0 +1,247 @@
+##############################################################
+###                                                        ###
+###             CYCLICA ALPHAFOLD 2 CHALLENGE              ###
+###                                                        ###
+##############################################################
+
+# server.py keeps a trained model loaded and scores residues over HTTP, on a
+# TCP port or a Unix socket, so interactive tools do not pay TensorFlow's
+# start-up and the model load on every query.
+#
+# Requests are handled on their own threads, but none of them calls the model
+# directly. Each one featurizes its residues and queues the rows; a single
+# batcher thread takes everything queued within `max_latency` seconds of the
+# first waiting request (up to `max_batch` rows), runs one prediction over the
+# lot and hands every request its slice. Many small concurrent queries then
+# cost one model call instead of one each.
+#
+#   python server.py --port 8080 --max-latency 0.005
+#   curl -d '{"residues": [{"annotation_sequence": "A", "feat_PHI": ...}]}' localhost:8080/score
+#
+# POST /score takes {"residues": [<CSV row as an object>, ...]} (a whole
+# protein or any residues) or {"parameters": [[...], ...]} already featurized,
+# plus an optional "threshold", and answers {"probabilities": [...],
+# "predictions": [...]}. GET /stats reports batching counters, and the hit and
+# miss counters of the prediction cache when --cache-mb turns it on.
+
+import argparse
+import json
+import os
+import queue
+import socketserver
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from featurizer import FEATURE_NAMES, build_parameters
+from numpy_mlp import NumpyMLP
+from predcache import PredictionCache, model_version
+
+MAX_BATCH = 8192
+MAX_LATENCY = 0.005
+
+# Pending connections the listening socket queues (socketserver's default of
+# 5 turns away bursts of concurrent clients).
+
+BACKLOG = 1024
+
+
+class MicroBatcher:
+    """Coalesce concurrent predict calls into batched calls of `predict`.
+
+    `predict` maps an (n, n_features) float32 array to n probabilities.
+    """
+
+    def __init__(self, predict, max_batch=MAX_BATCH, max_latency=MAX_LATENCY):
+        self.predict = predict
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self.pending = queue.Queue()
+        self.batches = 0
+        self.rows = 0
+        self.requests = 0
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+
+    def submit(self, parameters):
+        """Queue `parameters` for the next batch; returns a Future of its probabilities."""
+        future = Future()
+        self.pending.put((np.asarray(parameters, dtype=np.float32), future))
+        return future
+
+    def __call__(self, parameters):
+        return self.submit(parameters).result()
+
+    def _collect(self):
+        # Block for the first request, then take whatever arrives in the window.
+        waiting = [self.pending.get()]
+        size = len(waiting[0][0])
+        deadline = time.monotonic() + self.max_latency
+        while size < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self.pending.get(timeout=remaining)
+            except queue.Empty:
+                break
+            waiting.append(item)
+            size += len(item[0])
+        return waiting
+
+    def _run(self):
+        while True:
+            waiting = self._collect()
+            try:
+                parameters = np.concatenate([item[0] for item in waiting])
+                probabilities = np.asarray(self.predict(parameters)).reshape(-1)
+            except Exception as error:
+                for _, future in waiting:
+                    future.set_exception(error)
+                continue
+
+            self.batches += 1
+            self.rows += len(parameters)
+            self.requests += len(waiting)
+            start = 0
+            for rows, future in waiting:
+                future.set_result(probabilities[start:start + len(rows)])
+                start += len(rows)
+
+
+def keras_predictor(path):
+    """Load the Keras model at `path` and return a predict function for MicroBatcher."""
+    from tensorflow.keras.models import load_model
+    model = load_model(path)
+    return lambda parameters: model.predict_on_batch(parameters)
+
+
+def numpy_predictor(path):
+    """Predict function running weights exported by numpy_mlp.py, without TensorFlow."""
+    return NumpyMLP.load(path).predict
+
+
+def request_parameters(body):
+    """The feature matrix of a /score request body."""
+    if 'parameters' in body:
+        parameters = np.asarray(body['parameters'], dtype=np.float32).reshape(-1, len(FEATURE_NAMES))
+    else:
+        parameters = build_parameters(pd.DataFrame.from_records(body['residues']))
+    return parameters
+
+
+def _has_keys(residues):
+    return all(isinstance(residue, dict) and 'entry' in residue and 'entry_index' in residue
+               for residue in residues)
+
+
+class ScoringHandler(BaseHTTPRequestHandler):
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if self.path != '/score':
+            return self._reply(404, {'error': 'unknown path {}'.format(self.path)})
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            if not isinstance(body, dict):
+                raise TypeError('request body must be a JSON object')
+            threshold = float(body.get('threshold', 0.5))
+            parameters = request_parameters(body)
+            keys = None
+            if self.server.cache is not None and 'residues' in body and _has_keys(body['residues']):
+                keys = ([residue['entry'] for residue in body['residues']],
+                        [residue['entry_index'] for residue in body['residues']])
+        except (ValueError, KeyError, TypeError, AttributeError) as error:
+            return self._reply(400, {'error': str(error)})
+
+        try:
+            if keys is not None:
+                probabilities = self.server.cache.predict(keys[0], keys[1], parameters)
+            else:
+                probabilities = self.server.batcher(parameters)
+        except Exception as error:
+            # The model failed on this batch; tell the client instead of dropping it.
+            return self._reply(500, {'error': '{}: {}'.format(type(error).__name__, error)})
+        self._reply(200, {'probabilities': probabilities.tolist(),
+                          'predictions': (probabilities >= threshold).astype(int).tolist()})
+
+    def do_GET(self):
+        if self.path != '/stats':
+            return self._reply(404, {'error': 'unknown path {}'.format(self.path)})
+        batcher = self.server.batcher
+        stats = {'requests': batcher.requests, 'batches': batcher.batches, 'rows': batcher.rows}
+        if self.server.cache is not None:
+            stats['cache'] = self.server.cache.stats()
+        self._reply(200, stats)
+
+    def address_string(self):
+        # Unix socket clients have no host address.
+        return self.client_address[0] if self.client_address else 'unix'
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+        socketserver.UnixStreamServer.server_bind(self)
+        self.server_name, self.server_port = self.server_address, 0
+
+
+def serve(batcher, port=8080, host='127.0.0.1', socket_path=None, cache=None, backlog=BACKLOG):
+    """Serve `batcher` until interrupted, on `socket_path` if given, else host:port.
+
+    With a PredictionCache (built over `batcher`), residues that carry entry
+    and entry_index are answered from it where possible. `backlog` is the
+    listen queue length.
+    """
+    if socket_path:
+        server = UnixHTTPServer(socket_path, ScoringHandler, bind_and_activate=False)
+    else:
+        server = ThreadingHTTPServer((host, port), ScoringHandler, bind_and_activate=False)
+    server.request_queue_size = backlog
+    server.batcher = batcher
+    server.cache = cache
+    try:
+        server.server_bind()
+        server.server_activate()
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Resident residue scoring service.")
+    parser.add_argument("--model", default="model.h5", help="model.h5, or an .npz from numpy_mlp.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--socket", metavar="PATH", help="listen on a Unix socket instead")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH, help="rows per model call")
+    parser.add_argument("--backlog", type=int, default=BACKLOG,
+                        help="pending connections queued by the listening socket")
+    parser.add_argument("--max-latency", type=float, default=MAX_LATENCY,
+                        help="seconds a request may wait for others to batch with")
+    parser.add_argument("--cache-mb", type=int, default=0,
+                        help="keep up to this many MB of recent residue predictions (default: off)")
+    args = parser.parse_args()
+
+    # An .npz from numpy_mlp.py is served without importing TensorFlow.
+    predictor = numpy_predictor if args.model.endswith('.npz') else keras_predictor
+    batcher = MicroBatcher(predictor(args.model), args.max_batch, args.max_latency)
+    print('Serving {} on {}'.format(args.model, args.socket or '{}:{}'.format(args.host, args.port)))
+    cache = None
+    if args.cache_mb:
+        cache = PredictionCache(batcher, model_version(args.model), args.cache_mb * 2 ** 20)
+    serve(batcher, args.port, args.host, args.socket, cache, args.backlog)
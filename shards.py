@@ -0,0 +1,162 @@
+##############################################################
+###                                                        ###
+###             CYCLICA ALPHAFOLD 2 CHALLENGE              ###
+###                                                        ###
+##############################################################
+
+# shards.py trains on more residues than fit in memory.
+#
+# write_shards() splits a feature matrix into fixed-size shard files on disk.
+# ShardStream then reads shards back with a pool of reader threads, mixes
+# their rows in a bounded shuffle buffer, and assembles batches on a
+# background thread that stays a few batches ahead of the model. Memory is
+# bounded by the shuffle buffer plus the shards in flight, not the corpus.
+
+import glob
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+SHARD_ROWS = 500000
+
+
+def write_shards(parameters, label, directory, rows=None, shard_rows=SHARD_ROWS):
+    """Write `parameters` and `label` (optionally just `rows`) as shard files.
+
+    Each shard is a shard-NNNNN-parameters.npy / shard-NNNNN-label.npy pair;
+    shards already in `directory` are replaced. Works from memory-mapped
+    inputs one shard at a time. Returns the shard prefixes.
+    """
+    os.makedirs(directory, exist_ok=True)
+    for prefix in shard_prefixes(directory):
+        os.unlink(prefix + '-parameters.npy')
+        os.unlink(prefix + '-label.npy')
+    rows = np.arange(len(parameters)) if rows is None else np.sort(rows)
+
+    prefixes = []
+    for number, start in enumerate(range(0, len(rows), shard_rows)):
+        chunk = rows[start:start + shard_rows]
+        prefix = os.path.join(directory, 'shard-{:05d}'.format(number))
+        np.save(prefix + '-parameters.npy', np.ascontiguousarray(parameters[chunk]))
+        np.save(prefix + '-label.npy', np.asarray(label[chunk], dtype=np.float32).reshape(-1))
+        prefixes.append(prefix)
+    return prefixes
+
+
+def shard_prefixes(directory):
+    """Prefixes of the shards written to `directory`, in order."""
+    return sorted(path[:-len('-parameters.npy')]
+                  for path in glob.glob(os.path.join(directory, 'shard-*-parameters.npy')))
+
+
+def _read_shard(prefix):
+    return np.load(prefix + '-parameters.npy'), np.load(prefix + '-label.npy')
+
+
+class ShardStream:
+    """Endless shuffled (x, y) batches streamed from the shards in `directory`.
+
+    `shuffle_buffer` rows are held at any time; `readers` threads load shards
+    ahead of the buffer and `prefetch` finished batches wait for the model.
+    Shard order is reshuffled every epoch. Use with
+    `model.fit(iter(stream), steps_per_epoch=stream.steps_per_epoch)`.
+    """
+
+    def __init__(self, directory, batch_size=64, shuffle_buffer=100000, readers=4,
+                 prefetch=8, seed=42):
+        self.prefixes = shard_prefixes(directory)
+        if not self.prefixes:
+            raise ValueError('no shards in {}'.format(directory))
+        self.batch_size = batch_size
+        self.shuffle_buffer = max(shuffle_buffer, batch_size)
+        self.readers = readers
+        self.prefetch = prefetch
+        self.random = np.random.default_rng(seed)
+
+        # Shard sizes come from the .npy headers, without reading the data.
+        self.rows = sum(np.load(prefix + '-label.npy', mmap_mode='r').shape[0]
+                        for prefix in self.prefixes)
+        self.n_features = np.load(self.prefixes[0] + '-parameters.npy', mmap_mode='r').shape[1]
+
+    @property
+    def steps_per_epoch(self):
+        return max(self.rows // self.batch_size, 1)
+
+    def _shards(self):
+        # Shards of one epoch after another, read `readers` at a time.
+        with ThreadPoolExecutor(self.readers) as pool:
+            while True:
+                order = self.random.permutation(len(self.prefixes))
+                pending = [pool.submit(_read_shard, self.prefixes[i]) for i in order[:self.readers]]
+                for i in order[self.readers:]:
+                    yield pending.pop(0).result()
+                    pending.append(pool.submit(_read_shard, self.prefixes[i]))
+                for job in pending:
+                    yield job.result()
+
+    def _batches(self):
+        x = np.empty((self.shuffle_buffer, self.n_features), dtype=np.float32)
+        y = np.empty(self.shuffle_buffer, dtype=np.float32)
+        held = 0
+
+        for shard_x, shard_y in self._shards():
+            start = 0
+            while start < len(shard_y):
+                # Top the buffer up from the shard first.
+                take = min(self.shuffle_buffer - held, len(shard_y) - start)
+                x[held:held + take] = shard_x[start:start + take]
+                y[held:held + take] = shard_y[start:start + take]
+                held += take
+                start += take
+
+                # Then, while it is full, emit a random batch and refill the
+                # emptied slots straight from the shard.
+                while held == self.shuffle_buffer:
+                    picks = self.random.choice(held, self.batch_size, replace=False)
+                    yield x[picks], y[picks]
+
+                    refill = min(self.batch_size, len(shard_y) - start)
+                    x[picks[:refill]] = shard_x[start:start + refill]
+                    y[picks[:refill]] = shard_y[start:start + refill]
+                    start += refill
+                    if refill < self.batch_size:
+                        # Shard ran out; close the gaps and go read the next one.
+                        keep = np.setdiff1d(np.arange(held), picks[refill:])
+                        x[:len(keep)], y[:len(keep)] = x[keep], y[keep]
+                        held = len(keep)
+
+    def __iter__(self):
+        batches = queue.Queue(maxsize=self.prefetch)
+        stop = threading.Event()
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    batches.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def produce():
+            try:
+                for batch in self._batches():
+                    if not put(batch):
+                        return
+            except BaseException as error:
+                # Hand read errors to the training loop instead of hanging it.
+                put(error)
+
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+        try:
+            while True:
+                batch = batches.get()
+                if isinstance(batch, BaseException):
+                    raise batch
+                yield batch
+        finally:
+            stop.set()
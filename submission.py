@@ -0,0 +1,212 @@
+##############################################################
+###                                                        ###
+###             CYCLICA ALPHAFOLD 2 CHALLENGE              ###
+###                                                        ###
+##############################################################
+
+# submission.py writes predictions in the challenge's submission format:
+#
+#   id,Predicted
+#   0,True
+#   1,False
+#
+# `id` is the CSV row id and Predicted the thresholded prediction. Optional
+# columns follow: Probability (the model output, which is what ROC-AUC and
+# PR-AUC are computed from), entry and entry_index.
+#
+# Blocks of rows are thresholded in one vectorized step and written whole.
+# The format follows the file name: .csv, .csv.gz, .parquet (needs pyarrow)
+# or .npz (one array per column). For .npz each column is spilled to a raw
+# scratch file as blocks arrive and copied into the archive at close, so no
+# format holds more than one block in memory.
+#
+# Everything is written to `<path>.tmp` and moved over `path` only when the
+# writer closes cleanly. If the run fails, the partial output and scratch
+# files are deleted, so a truncated file never looks like a finished one.
+
+import gzip
+import io
+import os
+import zipfile
+
+import numpy as np
+
+BUFFER_BYTES = 1 << 22
+
+FORMATS = ('csv', 'csv.gz', 'parquet', 'npz')
+
+
+def output_format(path):
+    for name in sorted(FORMATS, key=len, reverse=True):
+        if path.endswith('.' + name):
+            return name
+    raise ValueError('cannot tell the output format of {}; use one of {}'.format(path, FORMATS))
+
+
+class SubmissionWriter:
+    """Append prediction blocks to a submission file; use as a context manager.
+
+    `path` only appears once close() succeeds; abort() (or leaving the
+    `with` block on an exception) discards the partial output instead.
+    """
+
+    def __init__(self, path, threshold=0.5, probabilities=False, residues=False):
+        self.path = path
+        self.format = output_format(path)
+        self._partial = path + '.tmp'
+        self.threshold = threshold
+        self.probabilities = probabilities
+        self.residues = residues
+        self.rows = 0
+        self._spills = {}
+        self._parquet = None
+        self._header = False
+
+        if self.format == 'csv':
+            self._out = open(self._partial, 'w', buffering=BUFFER_BYTES, newline='')
+        elif self.format == 'csv.gz':
+            self._out = io.TextIOWrapper(io.BufferedWriter(gzip.open(self._partial, 'wb', compresslevel=6),
+                                                           BUFFER_BYTES), newline='')
+
+    def columns(self, ids, probabilities, entries=None, positions=None):
+        """The output columns of one block, as a dict of arrays."""
+        probabilities = np.asarray(probabilities, dtype=np.float32).reshape(-1)
+        columns = {'id': np.asarray(ids), 'Predicted': probabilities >= self.threshold}
+        if self.probabilities:
+            columns['Probability'] = probabilities
+        if self.residues:
+            if entries is None or positions is None:
+                raise ValueError('residue columns need entries and positions')
+            columns['entry'] = np.asarray(entries, dtype=str)
+            columns['entry_index'] = np.asarray(positions)
+        return columns
+
+    def write(self, ids, probabilities, entries=None, positions=None):
+        """Write one block of rows."""
+        columns = self.columns(ids, probabilities, entries, positions)
+        if self.format == 'npz':
+            self._spill(columns)
+        else:
+            import pandas as pd
+            frame = pd.DataFrame(columns)
+            if self.format == 'parquet':
+                self._write_parquet(frame)
+            else:
+                frame.to_csv(self._out, header=not self._header, index=False, float_format='%.6g')
+                self._header = True
+        self.rows += len(columns['id'])
+
+    def _spill(self, columns):
+        # Per column: scratch file, dtype, and for strings the (rows, width)
+        # of each block, since the widest entry id is only known at the end.
+        for name, values in columns.items():
+            if name not in self._spills:
+                scratch = open('{}.{}.part'.format(self.path, name), 'wb', buffering=BUFFER_BYTES)
+                self._spills[name] = (scratch, values.dtype, [])
+            scratch, dtype, blocks = self._spills[name]
+            if dtype.kind != 'U':
+                values = values.astype(dtype, copy=False)
+            blocks.append((len(values), values.dtype.itemsize))
+            scratch.write(np.ascontiguousarray(values).tobytes())
+
+    def _write_npz(self):
+        if not self._spills:
+            self._spill(self.columns([], [], [], []))
+
+        with zipfile.ZipFile(self._partial, 'w', allowZip64=True) as archive:
+            for name, (scratch, dtype, blocks) in self._spills.items():
+                scratch.close()
+                if dtype.kind == 'U':
+                    dtype = np.dtype('<U{}'.format(max(max(width for _, width in blocks) // 4, 1)))
+                with archive.open(name + '.npy', 'w', force_zip64=True) as out, \
+                        open(scratch.name, 'rb') as source:
+                    np.lib.format.write_array_header_1_0(out, {
+                        'descr': np.lib.format.dtype_to_descr(dtype),
+                        'fortran_order': False, 'shape': (self.rows,)})
+                    if dtype.kind == 'U':
+                        for count, width in blocks:
+                            block = np.frombuffer(source.read(count * width),
+                                                  dtype='<U{}'.format(max(width // 4, 1)))
+                            out.write(block.astype(dtype).tobytes())
+                    else:
+                        step = max(BUFFER_BYTES // dtype.itemsize, 1) * dtype.itemsize
+                        for chunk in iter(lambda: source.read(step), b''):
+                            out.write(chunk)
+                os.unlink(scratch.name)
+
+    def _write_parquet(self, frame):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError('writing .parquet needs pyarrow; use .npz instead') from None
+        table = pyarrow.Table.from_pandas(frame, preserve_index=False)
+        if self._parquet is None:
+            self._parquet = pyarrow.parquet.ParquetWriter(self._partial, table.schema)
+        self._parquet.write_table(table)
+
+    def close(self):
+        """Finish the file and move it into place at `path`."""
+        try:
+            if self.format == 'npz':
+                self._write_npz()
+            elif self.format == 'parquet':
+                if self._parquet is None:
+                    import pandas as pd
+                    self._write_parquet(pd.DataFrame(self.columns([], [], [], [])))
+                self._parquet.close()
+            else:
+                if not self._header:
+                    self._out.write(','.join(self.columns([], [], [], [])) + '\n')
+                self._out.close()
+        except BaseException:
+            self.abort()
+            raise
+        os.replace(self._partial, self.path)
+
+    def abort(self):
+        """Close everything and delete the partial output and scratch files."""
+        handles = [scratch for scratch, _, _ in self._spills.values()]
+        handles.append(self._parquet if self.format == 'parquet' else getattr(self, '_out', None))
+        for handle in handles:
+            if handle is not None:
+                try:
+                    handle.close()
+                except Exception:
+                    pass
+        for name in [self._partial] + [scratch.name for scratch, _, _ in self._spills.values()]:
+            if os.path.exists(name):
+                os.unlink(name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write_submission(path, ids, probabilities, threshold=0.5, entries=None, positions=None,
+                     probabilities_column=False):
+    """Write a whole submission at once. Residue columns are added when
+    `entries` and `positions` are given. Returns the number of rows."""
+    residues = entries is not None and positions is not None
+    with SubmissionWriter(path, threshold, probabilities_column, residues) as writer:
+        writer.write(ids, probabilities, entries, positions)
+    return writer.rows
+
+
+def write_features_submission(path, features, probabilities, threshold=0.5,
+                              probabilities_column=False, residues=False):
+    """Write predictions for every stored row of `features` (cache.Features),
+    given in stored order, as a submission in CSV row order."""
+    columns = [features.ids, np.asarray(probabilities).reshape(-1)]
+    if residues:
+        columns += [features.index.entries[features.index.protein_of_rows()], features.positions]
+    columns = [features.in_file_order(np.asarray(column)) for column in columns]
+    return write_submission(path, *columns[:2], threshold=threshold,
+                            entries=columns[2] if residues else None,
+                            positions=columns[3] if residues else None,
+                            probabilities_column=probabilities_column)
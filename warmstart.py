@@ -0,0 +1,196 @@
+##############################################################
+###                                                        ###
+###             CYCLICA ALPHAFOLD 2 CHALLENGE              ###
+###                                                        ###
+##############################################################
+
+# warmstart.py updates a trained model when new labeled proteins arrive,
+# instead of training again from scratch.
+#
+# The feature store (cache.update_features) tells us which entries are new or
+# changed. The model picks up from its saved weights (the Keras net) or trees
+# (XGBoost) and trains on those residues plus a random replay sample of
+# residues it has already seen, so it learns the new proteins without drifting
+# away from the old ones. Each update is saved as a new numbered version in
+# models/, and remembers which proteins (entry and content hash) it has seen,
+# so the next update knows what is new to it. Base versions are saved, with
+# their proteins, by cyclica.py, example.py and cli.py train.
+#
+#   python warmstart.py --model mlp --epochs 2 af2_dataset_training_labeled.csv
+
+import argparse
+import json
+import os
+
+import numpy as np
+
+from binning import MAX_BIN, quantize
+from cache import staging_directory, update_features
+from sampling import BalancedBatches
+
+# Versions live in models/<kind>/v0001, v0002, ... with kind 'mlp' or 'xgboost'.
+
+MODEL_DIR = 'models'
+
+# Replayed old residues per new residue.
+
+REPLAY = 1.0
+
+
+def model_directory(kind):
+    return os.path.join(MODEL_DIR, kind)
+
+
+def model_versions(directory):
+    """Numbers of the saved model versions, oldest first."""
+    if not os.path.isdir(directory):
+        return []
+    return sorted(int(name[1:]) for name in os.listdir(directory)
+                  if name.startswith('v') and name[1:].isdigit())
+
+
+def version_path(version, directory):
+    return os.path.join(directory, 'v{:04d}'.format(version))
+
+
+def save_model_version(model, directory, cuts=None, seen=None, **info):
+    """Save `model` as the next version in `directory` and return its number.
+
+    Keras models are saved as model.h5; XGBoost models as booster.json with
+    the bin `cuts` they were trained on. `seen` is the (entries, digests) of
+    the proteins the model has trained on; `info` goes to info.json.
+    """
+    version = (model_versions(directory) or [0])[-1] + 1
+    with staging_directory(version_path(version, directory)) as staging:
+        if hasattr(model, 'get_booster'):
+            model = model.get_booster()
+        if hasattr(model, 'save_model'):
+            model.save_model(os.path.join(staging, 'booster.json'))
+            np.save(os.path.join(staging, 'cuts.npy'), cuts)
+        else:
+            model.save(os.path.join(staging, 'model.h5'))
+        if seen is not None:
+            np.save(os.path.join(staging, 'seen_entries.npy'), seen[0])
+            np.save(os.path.join(staging, 'seen_digests.npy'), seen[1])
+        with open(os.path.join(staging, 'info.json'), 'w') as out:
+            json.dump(dict(info, version=version), out, indent=2)
+    return version
+
+
+def load_model_version(directory, version=None):
+    """Return (model, cuts, seen, info) of `version` (default: the latest).
+
+    `cuts` is None for the Keras net, and `seen` is None when the version
+    did not record its proteins.
+    """
+    if version is None:
+        versions = model_versions(directory)
+        if not versions:
+            raise FileNotFoundError('no model versions in {}'.format(directory))
+        version = versions[-1]
+    path = version_path(version, directory)
+
+    with open(os.path.join(path, 'info.json')) as source:
+        info = json.load(source)
+    seen = None
+    if os.path.exists(os.path.join(path, 'seen_entries.npy')):
+        seen = (np.load(os.path.join(path, 'seen_entries.npy')),
+                np.load(os.path.join(path, 'seen_digests.npy')))
+
+    if os.path.exists(os.path.join(path, 'booster.json')):
+        import xgboost
+        booster = xgboost.Booster(model_file=os.path.join(path, 'booster.json'))
+        return booster, np.load(os.path.join(path, 'cuts.npy')), seen, info
+
+    from tensorflow.keras.models import load_model
+    return load_model(os.path.join(path, 'model.h5')), None, seen, info
+
+
+def seen_proteins(features):
+    """The (entries, digests) a model trained on `features` (cache.Features) has seen."""
+    return np.asarray(features.index.entries), np.asarray(features.digests)
+
+
+def new_proteins(index, digests, seen):
+    """Protein numbers in `index` (with content `digests`) that are missing
+    from, or changed since, the `seen` (entries, digests) of a model."""
+    position = np.searchsorted(seen[0], index.entries)
+    found = position < len(seen[0])
+    found[found] = seen[0][position[found]] == index.entries[found]
+    known = found.copy()
+    known[found] = seen[1][position[found]] == digests[found]
+    return np.flatnonzero(~known)
+
+
+def replay_rows(new_rows, n_rows, replay=REPLAY, seed=42):
+    """`new_rows` plus a random `replay` share of the other rows, sorted."""
+    old_rows = np.setdiff1d(np.arange(n_rows), new_rows, assume_unique=True)
+    size = min(len(old_rows), int(round(replay * len(new_rows))))
+    sample = np.random.default_rng(seed).choice(old_rows, size, replace=False)
+    return np.sort(np.concatenate((new_rows, sample)))
+
+
+def warm_start(path, model, cuts, seen, epochs=2, rounds=20, replay=REPLAY,
+               threads=None, seed=42):
+    """Continue training `model` on the proteins of `path` outside its `seen`.
+
+    Returns (features, model, info), or (features, None, info) when nothing
+    is new.
+    """
+    if seen is None:
+        raise ValueError('the base model has no record of the proteins it was trained on')
+    features = update_features(path, labeled=True)[0]
+    proteins = new_proteins(features.index, features.digests, seen)
+    info = {'source': os.path.abspath(path), 'new_entries': len(proteins)}
+    if not len(proteins):
+        return features, None, info
+
+    new_rows = features.index.protein_rows(proteins)
+    rows = replay_rows(new_rows, len(features.label), replay, seed)
+    info.update(new_residues=len(new_rows), replayed_residues=len(rows) - len(new_rows))
+
+    if cuts is None:
+        batches = BalancedBatches(features.parameters, features.label, rows=rows, seed=seed)
+        model.fit(iter(batches), steps_per_epoch=batches.steps_per_epoch, epochs=epochs)
+        info.update(epochs=epochs)
+    else:
+        import xgboost
+        matrix = xgboost.DMatrix(quantize(features.parameters[rows], cuts),
+                                 label=features.label[rows].reshape(-1))
+        params = {'objective': 'binary:logistic', 'tree_method': 'hist', 'max_bin': MAX_BIN,
+                  'nthread': threads or os.cpu_count(), 'seed': seed}
+        model = xgboost.train(params, matrix, num_boost_round=rounds, xgb_model=model)
+        info.update(rounds=rounds)
+
+    return features, model, info
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Warm-start a model on new labeled entries.")
+    parser.add_argument("path", nargs="?", default="af2_dataset_training_labeled.csv")
+    parser.add_argument("--model", choices=["mlp", "xgboost"], default="mlp")
+    parser.add_argument("--version", type=int, help="model version to start from (default: latest)")
+    parser.add_argument("--epochs", type=int, default=2, help="epochs for the Keras net")
+    parser.add_argument("--rounds", type=int, default=20, help="extra boosting rounds for XGBoost")
+    parser.add_argument("--replay", type=float, default=REPLAY,
+                        help="old residues replayed per new residue")
+    parser.add_argument("--threads", type=int)
+    args = parser.parse_args()
+
+    # Base versions come from cyclica.py, example.py or cli.py train.
+    directory = model_directory(args.model)
+    model, cuts, seen, base = load_model_version(directory, args.version)
+    if seen is None:
+        parser.error('version {} of {} does not record the proteins it was trained on; '
+                     'retrain it with cyclica.py, example.py or cli.py train'.format(
+                         base['version'], directory))
+
+    features, model, info = warm_start(args.path, model, cuts, seen, args.epochs, args.rounds,
+                                       args.replay, args.threads)
+    if model is None:
+        print('No new or changed entries since the model was trained')
+    else:
+        version = save_model_version(model, directory, cuts=cuts, seen=seen_proteins(features),
+                                     parent=base['version'], **info)
+        print('Trained on {new_residues} new and {replayed_residues} replayed residues'.format(**info))
+        print('Saved version {} to {}'.format(version, version_path(version, directory)))
@@ -0,0 +1,86 @@
+##############################################################
+###                                                        ###
+###             CYCLICA ALPHAFOLD 2 CHALLENGE              ###
+###                                                        ###
+##############################################################
+
+# window.py adds sequence context to each residue: the features of the k
+# residues before and after it along the chain, ordered by `entry_index`
+# within each `entry`.
+#
+# Residues are put in chain order once, into a buffer with k rows of zero
+# padding at each end. A sliding-window view over that buffer gives every
+# residue its (2k + 1)-row window without copying, and positions that fall
+# outside the residue's own protein (chain ends, or the next protein in the
+# buffer) are zeroed with a mask. The columns are named
+# win<offset>_<feature>, e.g. win-2_feat_pLDDT.
+
+from functools import partial
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from featurizer import FEATURE_SCHEMA, FeatureStage, feature_values
+from loader import entry_order
+
+HALF_WIDTH = 3
+
+WINDOW_FEATURES = ('hydrophilicity', 'pI', 'feat_pLDDT', 'feat_SCSASA',
+                   'feat_DSSP_H', 'feat_DSSP_E')
+
+
+def _schema_feature(name):
+    for feature in FEATURE_SCHEMA:
+        if name in feature.names:
+            return feature, feature.names.index(name)
+    raise ValueError('{!r} is not a feature in FEATURE_SCHEMA'.format(name))
+
+
+def window_names(half_width=HALF_WIDTH, features=WINDOW_FEATURES):
+    return tuple('win{}_{}'.format(offset, name)
+                 for offset in range(-half_width, half_width + 1) if offset
+                 for name in features)
+
+
+def window_features(data, half_width=HALF_WIDTH, features=WINDOW_FEATURES):
+    """Return the (n, 2 * half_width * len(features)) window columns for `data`."""
+    n, k = len(data), half_width
+    order, index = entry_order(data)
+    position = index.positions()
+    length = index.sizes()[index.protein_of_rows()]
+
+    out = np.empty((n, 2 * k * len(features)), dtype=np.float32)
+    if n == 0:
+        return out
+
+    # Chain-ordered feature values, written straight into the padded buffer.
+    padded = np.zeros((n + 2 * k, len(features)), dtype=np.float32)
+    sources = {}
+    for column, name in enumerate(features):
+        feature, part = _schema_feature(name)
+        if feature.source not in sources:
+            sources[feature.source] = feature_values(data[feature.source], feature).reshape(n, -1)
+        padded[k:n + k, column] = sources[feature.source][order, part]
+
+    offsets = np.array([offset for offset in range(-k, k + 1) if offset])
+    windows = sliding_window_view(padded, 2 * k + 1, axis=0)[:, :, offsets + k]
+
+    inside = ((position[:, None] + offsets >= 0) &
+              (position[:, None] + offsets < length[:, None]))
+
+    out[order] = (windows * inside[:, None, :]).transpose(0, 2, 1).reshape(n, -1)
+    return out
+
+
+def window_stage(half_width=HALF_WIDTH, features=WINDOW_FEATURES):
+    """Feature stage adding sequence-window columns, for build_parameters(stages=...)."""
+    features = tuple(features)
+    columns = []
+    for name in features:
+        source = _schema_feature(name)[0].source
+        if source not in columns:
+            columns.append(source)
+
+    return FeatureStage(build=partial(window_features, half_width=half_width, features=features),
+                        names=window_names(half_width, features),
+                        columns=columns + ['entry', 'entry_index'])